@@ -0,0 +1,168 @@
+import array
+import math
+
+import numpy as np
+
+from wyoming_rhasspy_speech.audio import (
+    AudioBuffer,
+    PcmConverter,
+    PolyphaseResampler,
+    SpeexSession,
+    multiply_volume,
+    pcm_to_float,
+    process_frames,
+)
+
+
+def test_multiply_volume() -> None:
+    chunk = array.array("h", [0, 100, -100, 20000, -20000]).tobytes()
+    audio, num_clipped = multiply_volume(chunk, 2.0)
+
+    assert array.array("h", audio).tolist() == [0, 200, -200, 32767, -32768]
+    assert num_clipped == 2
+
+
+def test_multiply_volume_truncates() -> None:
+    chunk = array.array("h", [3, -3]).tobytes()
+    audio, num_clipped = multiply_volume(chunk, 0.5)
+
+    # Same as int()
+    assert array.array("h", audio).tolist() == [1, -1]
+    assert num_clipped == 0
+
+
+def test_audio_buffer() -> None:
+    buffer = AudioBuffer(capacity=4)
+    assert not buffer
+
+    buffer.write(b"abc")
+    assert bytes(buffer.peek(2)) == b"ab"
+    buffer.skip(2)
+    assert len(buffer) == 1
+
+    # Compacts instead of growing
+    buffer.write(b"def")
+    assert buffer.capacity == 4
+    assert buffer.getvalue() == b"cdef"
+
+    # Grows
+    buffer.write(b"ghi")
+    assert buffer.capacity == 8
+    assert buffer.read(3) == b"cde"
+    assert buffer.read() == b"fghi"
+    assert not buffer
+
+    assert buffer.high_water_mark == 7
+
+    buffer.write(b"xyz")
+    buffer.clear()
+    assert buffer.getvalue() == b""
+
+
+def test_audio_buffer_max_bytes() -> None:
+    buffer = AudioBuffer(capacity=4, max_bytes=6)
+    assert buffer.write(b"abcd") == 0
+
+    # Oldest bytes are dropped
+    assert buffer.write(b"efgh") == 2
+    assert buffer.getvalue() == b"cdefgh"
+
+    # Only the end of a write that is too large is kept
+    assert buffer.write(b"12345678") == 8
+    assert buffer.getvalue() == b"345678"
+    assert buffer.high_water_mark == 6
+
+
+def upper(frame: memoryview) -> bytes:
+    return frame.tobytes().upper()
+
+
+def test_process_frames() -> None:
+    input_buffer = AudioBuffer()
+    output_buffer = AudioBuffer()
+
+    input_buffer.write(b"aabbc")
+    assert process_frames(upper, input_buffer, output_buffer, 2) == 2
+    assert output_buffer.read() == b"AABB"
+
+    # Remainder is kept
+    assert input_buffer.getvalue() == b"c"
+    input_buffer.write(b"c")
+    assert process_frames(upper, input_buffer, output_buffer, 2) == 1
+    assert output_buffer.read() == b"CC"
+
+
+def test_pcm_converter_pass_through() -> None:
+    audio = array.array("h", [1, 2, 3]).tobytes()
+    assert PcmConverter(16000).convert(audio, 16000, 2, 1) is audio
+
+
+def test_pcm_converter_partial_sample() -> None:
+    converter = PcmConverter(16000)
+    audio = array.array("h", [1, 2, 3, 4]).tobytes()
+
+    # Incomplete sample frame is kept for the next chunk
+    assert converter.convert(audio[:3], 16000, 2, 1) == audio[:2]
+    assert converter.convert(audio[3:], 16000, 2, 1) == audio[2:]
+
+    # Stereo frame split across chunks
+    stereo = array.array("h", [100, 300, 200, 400]).tobytes()
+    assert converter.convert(stereo[:5], 16000, 2, 2) == (
+        array.array("h", [200]).tobytes()
+    )
+    assert converter.convert(stereo[5:], 16000, 2, 2) == (
+        array.array("h", [300]).tobytes()
+    )
+
+    # Remainder is dropped for a new stream
+    converter.convert(audio[:1], 16000, 2, 1)
+    converter.reset()
+    assert converter.convert(audio, 16000, 2, 1) == audio
+
+
+def test_pcm_to_float() -> None:
+    # Signed like audioop
+    assert pcm_to_float(bytes([0, 128, 255]), 1).tolist() == [0, -32768, -256]
+    assert pcm_to_float(b"\x00\x00\x80\x00\x01\x00", 3).tolist() == [-32768, 1]
+    assert pcm_to_float(np.array([65536 * 5], dtype="<i4").tobytes(), 4).tolist() == [5]
+
+
+def test_pcm_converter_48khz_stereo() -> None:
+    in_rate = 48000
+    tone = [
+        int(10000 * math.sin(2 * math.pi * 1000 * i / in_rate)) for i in range(in_rate)
+    ]
+    stereo = array.array("h", [sample for sample in tone for _ in range(2)]).tobytes()
+
+    # Resampler state is kept between chunks
+    converter = PcmConverter(16000)
+    chunk_bytes = 1024 * 2 * 2
+    audio = b"".join(
+        converter.convert(stereo[i : i + chunk_bytes], in_rate, 2, 2)
+        for i in range(0, len(stereo), chunk_bytes)
+    )
+    samples = np.frombuffer(audio, dtype=np.int16)
+    assert len(samples) == 16000
+
+    expected = PolyphaseResampler(in_rate, 16000).process(
+        np.array(tone, dtype=np.float32)
+    )
+    assert np.abs(samples - expected).max() <= 1
+
+    # 1 Khz tone is preserved
+    spectrum = np.abs(np.fft.rfft(samples[1000:15000]))
+    assert round(np.argmax(spectrum) * 16000 / 14000) == 1000
+
+
+def test_speex_session_reset() -> None:
+    rng = np.random.default_rng(0)
+    noise = rng.integers(-5000, 5000, size=160 * 50, dtype=np.int16).tobytes()
+    frame = (np.sin(np.arange(160) / 4) * 10000).astype(np.int16).tobytes()
+
+    session = SpeexSession(4000, -30)
+    for frame_idx in range(0, len(noise), 320):
+        session.process_10ms(noise[frame_idx : frame_idx + 320])
+
+    # Noise estimate from the previous audio is discarded
+    session.reset()
+    assert session.process_10ms(frame) == SpeexSession(4000, -30).process_10ms(frame)
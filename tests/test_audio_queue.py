@@ -0,0 +1,107 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+from wyoming_rhasspy_speech.audio_queue import (
+    AudioQueue,
+    AudioQueueOverflowError,
+    OverflowPolicy,
+)
+
+
+async def _read_all(queue: AudioQueue) -> List[bytes]:
+    chunks: List[bytes] = []
+    while True:
+        chunk: Optional[bytes] = await queue.get()
+        if chunk is None:
+            break
+
+        chunks.append(chunk)
+
+    return chunks
+
+
+def test_block() -> None:
+    async def run() -> None:
+        queue = AudioQueue(max_bytes=4, policy=OverflowPolicy.BLOCK)
+        await queue.put(b"12")
+        await queue.put(b"34")
+        assert queue.num_bytes == 4
+
+        # Writer waits for the reader
+        put_task = asyncio.create_task(queue.put(b"56"))
+        await asyncio.sleep(0)
+        assert not put_task.done()
+
+        assert await queue.get() == b"12"
+        await put_task
+        assert queue.num_overflows == 1
+        assert queue.high_water_bytes == 4
+
+        queue.close()
+        assert await _read_all(queue) == [b"34", b"56"]
+
+    asyncio.run(run())
+
+
+def test_drop_oldest() -> None:
+    async def run() -> None:
+        queue = AudioQueue(max_bytes=4, policy=OverflowPolicy.DROP_OLDEST)
+        for chunk in (b"12", b"34", b"56"):
+            await queue.put(chunk)
+
+        queue.close()
+        assert await _read_all(queue) == [b"34", b"56"]
+        assert queue.num_dropped_bytes == 2
+
+    asyncio.run(run())
+
+
+def test_abort() -> None:
+    async def run() -> None:
+        queue = AudioQueue(max_bytes=4, policy=OverflowPolicy.ABORT)
+        await queue.put(b"1234")
+
+        with pytest.raises(AudioQueueOverflowError):
+            await queue.put(b"5")
+
+        with pytest.raises(AudioQueueOverflowError):
+            await queue.get()
+
+    asyncio.run(run())
+
+
+def test_close_unblocks_writer() -> None:
+    async def run() -> None:
+        queue = AudioQueue(max_bytes=2)
+
+        # Chunks larger than the queue are accepted when it's empty
+        await queue.put(b"1234")
+
+        put_task = asyncio.create_task(queue.put(b"5"))
+        await asyncio.sleep(0)
+        queue.close()
+        await put_task
+
+        assert await _read_all(queue) == [b"1234"]
+
+    asyncio.run(run())
+
+
+def test_frames() -> None:
+    async def run() -> None:
+        queue = AudioQueue(frame_bytes=4, flush_seconds=0.05)
+        for chunk in (b"1", b"23", b"456"):
+            await queue.put(chunk)
+
+        assert await queue.get() == b"1234"
+
+        # Partial frame is flushed after a delay
+        assert await asyncio.wait_for(queue.get(), timeout=1) == b"56"
+
+        await queue.put(b"7")
+        queue.close()
+        assert await _read_all(queue) == [b"7"]
+
+    asyncio.run(run())
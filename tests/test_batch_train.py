@@ -0,0 +1,59 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("rhasspy_speech")
+
+# pylint: disable=wrong-import-position
+from rhasspy_speech.const import LangSuffix
+
+from wyoming_rhasspy_speech.batch_train import train_models
+from wyoming_rhasspy_speech.shared import AppSettings, AppState
+
+
+def test_failures_are_isolated(tmp_path: Path) -> None:
+    settings = AppSettings(
+        train_dir=tmp_path / "train",
+        tools_dir=tmp_path / "tools",
+        models_dir=tmp_path / "models",
+        volume_multiplier=1.0,
+        vad_enabled=False,
+        vad_threshold=0.5,
+        before_speech_seconds=0.7,
+        endpoint_enabled=False,
+        endpoint_min_speech_seconds=0.3,
+        endpoint_silence_seconds=0.7,
+        endpoint_max_seconds=None,
+        speex_enabled=False,
+        speex_noise_suppression=0,
+        speex_auto_gain=0,
+        max_fuzzy_cost=2.0,
+        max_active=7000,
+        lattice_beam=8.0,
+        acoustic_scale=1.0,
+        beam=24.0,
+        nbest=1,
+        streaming=False,
+        decode_wav_file=False,
+        decode_mode=LangSuffix.ARPA,
+        arpa_rescore_order=None,
+        hass_builtin_intents=False,
+    )
+    state = AppState(settings=settings)
+
+    async def run() -> None:
+        # No sentences, so both jobs fail
+        results = await train_models(
+            state,
+            [("en_US-rhasspy", None), ("de_DE-rhasspy", None), ("en_US-rhasspy", None)],
+            max_workers=2,
+        )
+        assert [result.model_name for result in results] == [
+            "en_US-rhasspy",
+            "de_DE-rhasspy",
+        ]
+        assert all(result.error == "No intents" for result in results)
+        assert not any(result.is_trained for result in results)
+
+    asyncio.run(run())
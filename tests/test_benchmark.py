@@ -0,0 +1,121 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from wyoming.asr import Transcript
+from wyoming.audio import AudioChunk, AudioStop
+from wyoming.event import Event
+from wyoming.server import AsyncEventHandler, AsyncServer
+
+from wyoming_rhasspy_speech.benchmark import (
+    BenchmarkSummary,
+    ProcessMonitor,
+    WavAudio,
+    format_summaries,
+    percentile,
+    run_benchmark,
+)
+
+
+class EchoLengthHandler(AsyncEventHandler):
+    """Replies with the number of audio bytes received."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.num_bytes = 0
+
+    async def handle_event(self, event: Event) -> bool:
+        if AudioChunk.is_type(event.type):
+            self.num_bytes += len(AudioChunk.from_event(event).audio)
+        elif AudioStop.is_type(event.type):
+            await self.write_event(Transcript(text=str(self.num_bytes)).event())
+            return False
+
+        return True
+
+
+def test_percentile() -> None:
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 100) == 5.0
+
+
+def test_process_monitor_exited_child() -> None:
+    async def run() -> None:
+        monitor = ProcessMonitor(os.getpid(), interval=60)
+        monitor.start()
+
+        # Sample while the child is running, then after it has been reaped
+        child = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import time\nend = time.process_time() + 0.6\n"
+                "while time.process_time() < end: pass",
+            ]
+        )
+        time.sleep(0.5)
+        monitor.sample()
+        child.wait()
+        await monitor.stop()
+
+        # Child CPU time is counted once
+        assert 0.5 <= monitor.cpu_seconds < 0.85
+
+    asyncio.run(run())
+
+
+def test_run_benchmark(tmp_path: Path) -> None:
+    # 0.1 seconds of 16Khz 16-bit mono
+    wav = WavAudio(
+        path=tmp_path / "test.wav", audio=bytes(3200), rate=16000, width=2, channels=1
+    )
+
+    async def run() -> None:
+        uri = f"unix://{tmp_path / 'server.socket'}"
+        server = AsyncServer.from_uri(uri)
+        await server.start(EchoLengthHandler)
+
+        monitor = ProcessMonitor(os.getpid(), interval=0.01)
+        monitor.start()
+        try:
+            results = await run_benchmark(
+                uri,
+                [wav],
+                num_requests=5,
+                concurrency=2,
+                samples_per_chunk=320,
+                speed=0,
+            )
+        finally:
+            await monitor.stop()
+            await server.stop()
+
+        assert len(results) == 5
+        assert all(result.text == "3200" for result in results)
+        assert all(result.error is None for result in results)
+
+        summary = BenchmarkSummary.from_results(
+            results,
+            decode_mode="arpa",
+            streaming=True,
+            concurrency=2,
+            wall_seconds=1.0,
+            monitor=monitor,
+        )
+        assert summary.num_requests == 5
+        assert summary.num_errors == 0
+        assert summary.audio_seconds == 0.5
+        assert summary.time_to_transcript["p99"] is not None
+        assert summary.peak_rss_bytes > 0
+
+        # Saved runs can be loaded for --report
+        loaded = BenchmarkSummary.from_dict(summary.to_dict())
+        assert loaded == summary
+        assert "arpa/streaming" in format_summaries([loaded])
+
+    asyncio.run(run())
@@ -0,0 +1,8 @@
+from wyoming_rhasspy_speech.events import PartialTranscript
+
+
+def test_partial_transcript() -> None:
+    event = PartialTranscript(text="turn on the").event()
+    assert event.type == "partial-transcript"
+    assert PartialTranscript.is_type(event.type)
+    assert PartialTranscript.from_event(event) == PartialTranscript(text="turn on the")
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+from pathlib import Path
+from typing import AsyncIterable, List
+
+import pytest
+
+pytest.importorskip("rhasspy_speech")
+
+# pylint: disable=wrong-import-position
+from rhasspy_speech.const import LangSuffix
+from rhasspy_speech.transcribe_stream import KaldiNnet3StreamTranscriber
+from wyoming.asr import Transcribe, Transcript
+from wyoming.audio import AudioChunk, AudioStart, AudioStop
+from wyoming.event import Event
+
+from wyoming_rhasspy_speech.__main__ import RhasspySpeechEventHandler
+from wyoming_rhasspy_speech.events import PartialTranscript
+from wyoming_rhasspy_speech.pool import KeyedPool
+from wyoming_rhasspy_speech.shared import AppSettings, AppState
+
+MODEL_ID = "en_US-rhasspy"
+TEXT = "turn on the lights"
+
+# 512 samples at 16Khz 16-bit mono, like Silero VAD
+CHUNK_BYTES = 1024
+CHUNK_SECONDS = CHUNK_BYTES / (16000 * 2)
+
+SPEECH = b"\x00\x10" * (CHUNK_BYTES // 2)
+SILENCE = bytes(CHUNK_BYTES)
+
+
+class FakeVad:
+    """Detects speech in any chunk that isn't silent."""
+
+    def __init__(self) -> None:
+        self.num_resets = 0
+
+    def chunk_bytes(self) -> int:
+        return CHUNK_BYTES
+
+    def process_chunk(self, chunk: bytes) -> float:
+        return 1.0 if any(chunk) else 0.0
+
+    def reset(self) -> None:
+        self.num_resets += 1
+
+
+class FakeTranscriber(KaldiNnet3StreamTranscriber):
+    """Records decoded audio instead of running Kaldi."""
+
+    def __init__(self) -> None:  # pylint: disable=super-init-not-called
+        self.decoded: List[bytes] = []
+
+    async def async_transcribe(  # pylint: disable=arguments-differ
+        self, audio_stream: AsyncIterable[bytes], *args, **kwargs
+    ) -> List[str]:
+        audio = b"".join([chunk async for chunk in audio_stream])
+        self.decoded.append(audio)
+        return [TEXT]
+
+    async_transcribe_rescore = async_transcribe
+
+
+class FakeCoquiTranscriber:
+    def __init__(self) -> None:
+        self.audio = bytes()
+
+    async def start_stream(self) -> None:
+        self.audio = bytes()
+
+    async def process_chunk(self, chunk: bytes) -> None:
+        self.audio += chunk
+
+    async def finish_stream(self) -> bytes:
+        return self.audio
+
+    async def decode_probs(self, probs: bytes, train_dir: Path) -> str:
+        return TEXT
+
+    async def stop(self) -> None:
+        pass
+
+
+class HandlerTest:
+    """Event handler with fake VAD, transcribers, and client."""
+
+    def __init__(self, tmp_path: Path, **kwargs) -> None:
+        settings_kwargs = {
+            "vad_enabled": True,
+            "endpoint_enabled": False,
+            "streaming": False,
+            **kwargs,
+        }
+        settings = AppSettings(
+            train_dir=tmp_path / "train",
+            tools_dir=tmp_path / "tools",
+            models_dir=tmp_path / "models",
+            volume_multiplier=1.0,
+            vad_threshold=0.5,
+            before_speech_seconds=0.1,
+            endpoint_min_speech_seconds=0.1,
+            endpoint_silence_seconds=0.3,
+            endpoint_max_seconds=None,
+            speex_enabled=False,
+            speex_noise_suppression=0,
+            speex_auto_gain=0,
+            max_fuzzy_cost=2.0,
+            max_active=7000,
+            lattice_beam=8.0,
+            acoustic_scale=1.0,
+            beam=24.0,
+            nbest=1,
+            decode_wav_file=False,
+            decode_mode=LangSuffix.ARPA,
+            arpa_rescore_order=None,
+            **settings_kwargs,
+        )
+        self.state = AppState(settings=settings)
+        self.state.vad_pool = KeyedPool(lambda _key: FakeVad())
+        self.state.coqui_pool = KeyedPool(  # type: ignore[assignment]
+            lambda _key: FakeCoquiTranscriber()
+        )
+
+        self.transcriber = FakeTranscriber()
+        self.events: List[Event] = []
+
+        self.handler = RhasspySpeechEventHandler(
+            argparse.Namespace(), self.state, None, None  # type: ignore[arg-type]
+        )
+        self.handler.write_event = self.write_event  # type: ignore[assignment]
+        self.handler.get_transcriber = self.get_transcriber  # type: ignore[assignment]
+
+    async def write_event(self, event: Event) -> None:
+        self.events.append(event)
+
+    def get_transcriber(self, degraded: bool) -> FakeTranscriber:
+        return self.transcriber
+
+    async def start(self) -> None:
+        await self.handler.handle_event(Transcribe(name=MODEL_ID).event())
+        await self.handler.handle_event(
+            AudioStart(rate=16000, width=2, channels=1).event()
+        )
+
+    async def send(self, audio: bytes, num_chunks: int) -> None:
+        for _ in range(num_chunks):
+            await self.handler.handle_event(
+                AudioChunk(rate=16000, width=2, channels=1, audio=audio).event()
+            )
+
+    async def stop(self) -> None:
+        await self.handler.handle_event(AudioStop().event())
+
+    @property
+    def transcripts(self) -> List[str]:
+        return [
+            Transcript.from_event(event).text
+            for event in self.events
+            if Transcript.is_type(event.type)
+        ]
+
+    def metric_lines(self, name: str) -> List[str]:
+        return [
+            line
+            for line in self.state.metrics.registry.render().splitlines()
+            if line.startswith(name)
+        ]
+
+
+def num_chunks(seconds: float) -> int:
+    return int(seconds / CHUNK_SECONDS)
+
+
+def test_endpoint_before_audio_stop(tmp_path: Path) -> None:
+    test = HandlerTest(tmp_path, endpoint_enabled=True)
+
+    async def run() -> None:
+        await test.start()
+        await test.send(SILENCE, num_chunks(0.5))
+        await test.send(SPEECH, num_chunks(0.5))
+        assert not test.transcripts
+
+        # End of speech
+        await test.send(SILENCE, num_chunks(0.5))
+        assert test.transcripts == [TEXT]
+
+        # Audio after the transcript is ignored
+        await test.send(SPEECH, num_chunks(0.5))
+        await test.stop()
+        assert test.transcripts == [TEXT]
+        assert len(test.transcriber.decoded) == 1
+
+    asyncio.run(run())
+
+
+def test_partial_transcripts(tmp_path: Path) -> None:
+    test = HandlerTest(tmp_path, streaming=True, partial_interval=0.2)
+
+    async def run() -> None:
+        await test.start()
+        await test.send(SPEECH, num_chunks(0.5))
+
+        # Let the partial decode finish
+        await asyncio.sleep(0.1)
+        partials = [
+            PartialTranscript.from_event(event).text
+            for event in test.events
+            if PartialTranscript.is_type(event.type)
+        ]
+        assert partials == [TEXT]
+
+        await test.stop()
+        assert test.transcripts == [TEXT]
+
+    asyncio.run(run())
+
+
+def test_speculative_decode_used(tmp_path: Path) -> None:
+    test = HandlerTest(tmp_path, speculative_pause_seconds=0.2)
+
+    async def run() -> None:
+        await test.start()
+        await test.send(SPEECH, num_chunks(0.5))
+        await test.send(SILENCE, num_chunks(0.3))
+        assert test.handler.speculative_task is not None
+
+        await test.stop()
+        assert test.transcripts == [TEXT]
+        assert len(test.transcriber.decoded) == 1
+        assert test.handler.speculative_task is None
+        assert test.metric_lines("rhasspy_speech_speculative_decodes_total") == [
+            'rhasspy_speech_speculative_decodes_total{result="used"} 1.0'
+        ]
+
+    asyncio.run(run())
+
+
+def test_speculative_decode_cancelled_by_speech(tmp_path: Path) -> None:
+    test = HandlerTest(tmp_path, speculative_pause_seconds=0.2)
+
+    async def run() -> None:
+        await test.start()
+        await test.send(SPEECH, num_chunks(0.5))
+        await test.send(SILENCE, num_chunks(0.3))
+        assert test.handler.speculative_task is not None
+
+        # Speech resumes
+        await test.send(SPEECH, num_chunks(0.5))
+        assert test.handler.speculative_task is None
+
+        await test.stop()
+        assert test.transcripts == [TEXT]
+
+        # Final decode includes speech after the pause
+        assert test.transcriber.decoded[-1].endswith(SPEECH * num_chunks(0.5))
+        assert test.metric_lines("rhasspy_speech_speculative_decodes_total") == [
+            'rhasspy_speech_speculative_decodes_total{result="cancelled"} 1.0'
+        ]
+
+    asyncio.run(run())
+
+
+def test_no_speculative_decode_for_coqui(tmp_path: Path) -> None:
+    test = HandlerTest(tmp_path, speculative_pause_seconds=0.2)
+    model_dir = test.state.settings.model_data_dir(MODEL_ID)
+    model_dir.mkdir(parents=True)
+    (model_dir / "config.json").write_text('{"type": "coqui"}', encoding="utf-8")
+
+    async def run() -> None:
+        await test.start()
+        await test.send(SPEECH, num_chunks(0.5))
+        await test.send(SILENCE, num_chunks(0.3))
+        assert test.handler.speculative_task is None
+
+        await test.stop()
+        assert test.transcripts == [TEXT]
+        assert not test.transcriber.decoded
+
+    asyncio.run(run())
+
+
+def test_trim_silence(tmp_path: Path) -> None:
+    test = HandlerTest(tmp_path, trim_silence_padding=0.1)
+
+    async def run() -> None:
+        await test.start()
+        await test.send(SILENCE, num_chunks(0.5))
+        await test.send(SPEECH, num_chunks(0.5))
+        await test.send(SILENCE, num_chunks(1.0))
+        await test.stop()
+
+        assert test.transcripts == [TEXT]
+        (audio,) = test.transcriber.decoded
+
+        # Speech and padding are kept, but not the silence after speech
+        num_speech_bytes = len(SPEECH) * num_chunks(0.5)
+        num_padding_bytes = int(0.1 * 16000) * 2
+        assert SPEECH * num_chunks(0.5) in audio
+        assert len(audio) <= num_speech_bytes + (2 * num_padding_bytes) + CHUNK_BYTES
+
+    asyncio.run(run())
+
+
+def test_audio_start_resets_checked_out_vad(tmp_path: Path) -> None:
+    test = HandlerTest(tmp_path)
+
+    async def run() -> None:
+        await test.start()
+        vad = test.handler.vad
+        assert isinstance(vad, FakeVad)
+        await test.send(SPEECH, num_chunks(0.5))
+
+        # Utterance never stopped
+        await test.handler.handle_event(
+            AudioStart(rate=16000, width=2, channels=1).event()
+        )
+        assert test.handler.vad is vad
+        assert vad.num_resets == 1
+        assert not test.handler.is_speech_started
+
+    asyncio.run(run())
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from hassil.intents import Intents
+from wyoming_rhasspy_speech.intents_cache import get_cache_key, load_cached, save_cached
+
+
+def test_intents_cache(tmp_path: Path) -> None:
+    sentences_path = tmp_path / "sentences.yaml"
+    sentences_path.write_text(
+        "language: en\n"
+        "intents:\n"
+        "  TurnOn:\n"
+        "    data:\n"
+        "      - sentences:\n"
+        "          - turn on the light\n",
+        encoding="utf-8",
+    )
+    cache_path = tmp_path / "cache" / "intents.pickle"
+
+    key = get_cache_key([sentences_path], "en")
+    assert load_cached(cache_path, key) is None
+
+    intents = Intents.from_files([sentences_path])
+    save_cached(cache_path, key, (intents, {"light": "lait"}))
+    cached_intents, cached_words = load_cached(cache_path, key)
+    assert set(cached_intents.intents) == {"TurnOn"}
+    assert cached_words == {"light": "lait"}
+
+    # Changing a source file or the language invalidates the cache
+    assert get_cache_key([sentences_path], "de") != key
+    sentences_path.write_text(
+        sentences_path.read_text(encoding="utf-8") + "          - light on\n",
+        encoding="utf-8",
+    )
+    assert load_cached(cache_path, get_cache_key([sentences_path], "en")) is None
+
+    # Corrupt caches are ignored
+    cache_path.write_bytes(b"not a pickle")
+    assert load_cached(cache_path, key) is None
@@ -0,0 +1,55 @@
+from wyoming_rhasspy_speech.metrics import (
+    CallbackCounter,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    UtteranceStats,
+)
+
+
+def test_render() -> None:
+    registry = MetricsRegistry()
+    counter = registry.add(Counter("test_total", "Test counter", ("kind",)))
+    histogram = registry.add(Histogram("test_seconds", "Test histogram", (0.1, 1)))
+
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_total counter" in lines
+    assert 'test_total{kind="a"} 3.0' in lines
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_count 3" in lines
+    assert "test_seconds_sum 5.55" in lines
+
+
+def test_render_callbacks() -> None:
+    registry = MetricsRegistry()
+    registry.add(Gauge("test_queued", "Test gauge", lambda: 2))
+    registry.add(CallbackCounter("test_rejected_total", "Test counter", lambda: 5))
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_queued gauge" in lines
+    assert "test_queued 2.0" in lines
+    assert "# TYPE test_rejected_total counter" in lines
+    assert "test_rejected_total 5.0" in lines
+
+
+def test_real_time_factor() -> None:
+    stats = UtteranceStats()
+    assert stats.real_time_factor is None
+
+    stats.audio_seconds = 2.0
+    stats.add("decode", 0.5)
+    assert stats.real_time_factor == 0.25
+
+    # Streaming only measures the time after the audio ends
+    streaming_stats = UtteranceStats(audio_seconds=2.0)
+    streaming_stats.add("finalize", 0.1)
+    assert streaming_stats.real_time_factor is None
@@ -0,0 +1,84 @@
+from wyoming_rhasspy_speech.pool import KeyedPool
+
+
+def test_reuse() -> None:
+    created = []
+    pool: KeyedPool[str, object] = KeyedPool(
+        lambda key: created.append(key) or object(), max_idle=1
+    )
+
+    item = pool.acquire("a")
+    pool.release(item)
+    assert pool.acquire("a") is item
+    assert created == ["a"]
+
+    # Other key creates a new object
+    assert pool.acquire("b") is not item
+    assert created == ["a", "b"]
+
+
+def test_max_idle() -> None:
+    discarded = []
+    pool: KeyedPool[str, object] = KeyedPool(
+        lambda key: object(), max_idle=1, on_discard=discarded.append
+    )
+
+    item_1 = pool.acquire("a")
+    item_2 = pool.acquire("a")
+    assert item_1 is not item_2
+
+    pool.release(item_1)
+    pool.release(item_2)
+    assert discarded == [item_2]
+    assert pool.num_idle() == 1
+
+
+def test_idle_timeout() -> None:
+    discarded = []
+    pool: KeyedPool[str, object] = KeyedPool(
+        lambda key: object(), idle_timeout=0, on_discard=discarded.append
+    )
+
+    item = pool.acquire("a")
+    pool.release(item)
+    assert pool.acquire("a") is not item
+    assert discarded == [item]
+
+
+def test_invalidate() -> None:
+    discarded = []
+    pool: KeyedPool[str, object] = KeyedPool(
+        lambda key: object(), on_discard=discarded.append
+    )
+
+    idle_item = pool.acquire("a")
+    busy_item = pool.acquire("a")
+    pool.release(idle_item)
+
+    pool.invalidate(lambda key: key == "a")
+    assert discarded == [idle_item]
+
+    # Checked out objects aren't reused after invalidation
+    pool.release(busy_item)
+    assert discarded == [idle_item, busy_item]
+    assert pool.num_idle() == 0
+
+
+def test_preload_and_reset() -> None:
+    created = []
+    reset = []
+    pool: KeyedPool[str, object] = KeyedPool(
+        lambda key: created.append(key) or object(),
+        max_idle=2,
+        on_release=reset.append,
+    )
+
+    pool.preload("a")
+    assert created == ["a", "a"]
+    assert pool.num_idle() == 2
+
+    item = pool.acquire("a")
+    assert created == ["a", "a"]
+
+    pool.release(item)
+    assert reset == [item]
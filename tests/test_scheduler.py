@@ -0,0 +1,102 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from wyoming_rhasspy_speech.scheduler import (
+    DecodeRejectedError,
+    DecodeScheduler,
+    QueuePolicy,
+)
+
+
+def test_max_concurrent() -> None:
+    async def run() -> List[str]:
+        scheduler = DecodeScheduler(max_concurrent=1)
+        order: List[str] = []
+
+        async def decode(name: str) -> None:
+            async with scheduler.slot():
+                assert not scheduler.has_free_slot
+                order.append(f"{name}-start")
+                await asyncio.sleep(0.01)
+                order.append(f"{name}-end")
+
+        assert scheduler.has_free_slot
+        await asyncio.gather(decode("a"), decode("b"))
+        assert scheduler.num_active == 0
+        assert scheduler.has_free_slot
+        return order
+
+    assert asyncio.run(run()) == ["a-start", "a-end", "b-start", "b-end"]
+
+
+def test_shortest_first() -> None:
+    async def run() -> List[str]:
+        scheduler = DecodeScheduler(max_concurrent=1, policy=QueuePolicy.SHORTEST)
+        order: List[str] = []
+        release = asyncio.Event()
+
+        async def decode(name: str, audio_seconds: float) -> None:
+            async with scheduler.slot(audio_seconds=audio_seconds):
+                order.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(decode("first", 0))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(decode("long", 5)))
+        tasks.append(asyncio.create_task(decode("short", 1)))
+        await asyncio.sleep(0)
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["first", "short", "long"]
+
+
+def test_reject_and_degrade() -> None:
+    async def run() -> None:
+        scheduler = DecodeScheduler(max_concurrent=1, max_queued=2, degrade_queued=1)
+        release = asyncio.Event()
+        slots = []
+
+        async def decode() -> None:
+            async with scheduler.slot() as slot:
+                slots.append(slot)
+                await release.wait()
+
+        tasks = []
+        for _ in range(3):
+            tasks.append(asyncio.create_task(decode()))
+            await asyncio.sleep(0)
+
+        assert scheduler.num_queued == 2
+
+        # Queue is full
+        with pytest.raises(DecodeRejectedError):
+            async with scheduler.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        assert [slot.degraded for slot in slots] == [False, False, True]
+        assert scheduler.num_rejected == 1
+
+    asyncio.run(run())
+
+
+def test_timeout() -> None:
+    async def run() -> None:
+        scheduler = DecodeScheduler(max_concurrent=1)
+        async with scheduler.slot():
+            with pytest.raises(DecodeRejectedError):
+                async with scheduler.slot(timeout=0.01):
+                    pass
+
+            assert scheduler.num_queued == 0
+
+        assert scheduler.num_active == 0
+
+    asyncio.run(run())
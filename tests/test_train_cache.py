@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from wyoming_rhasspy_speech.train_cache import (
+    get_stale_suffixes,
+    get_suffix_hash,
+    hash_training_inputs,
+    remove_stamp,
+    write_stamp,
+)
+
+
+def test_hash_training_inputs(tmp_path: Path) -> None:
+    sentences_path = tmp_path / "sentences.yaml"
+    sentences_path.write_text("sentences: [turn on the light]", encoding="utf-8")
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "final.mdl").write_bytes(b"model")
+
+    inputs_hash = hash_training_inputs([sentences_path], model_dir)
+    assert inputs_hash == hash_training_inputs([sentences_path], model_dir)
+
+    # Lexicon journal is ignored
+    (model_dir / "lexicon.db-journal").write_bytes(b"journal")
+    assert inputs_hash == hash_training_inputs([sentences_path], model_dir)
+
+    sentences_path.write_text("sentences: [turn off the light]", encoding="utf-8")
+    assert inputs_hash != hash_training_inputs([sentences_path], model_dir)
+
+    # Settings only change the hash of their lang suffix
+    assert get_suffix_hash(inputs_hash, "arpa") != get_suffix_hash(
+        inputs_hash, "grammar"
+    )
+    assert get_suffix_hash(
+        inputs_hash, "arpa_rescore", rescore_order=4
+    ) != get_suffix_hash(inputs_hash, "arpa_rescore", rescore_order=5)
+
+
+def test_stale_suffixes(tmp_path: Path) -> None:
+    train_dir = tmp_path / "training"
+    suffix_hashes = {"arpa": "1234", "arpa_rescore": "5678"}
+
+    # Nothing trained
+    assert get_stale_suffixes(train_dir, suffix_hashes) == ["arpa", "arpa_rescore"]
+
+    for lang_suffix, suffix_hash in suffix_hashes.items():
+        (train_dir / "data" / f"lang_{lang_suffix}").mkdir(parents=True)
+        write_stamp(train_dir, lang_suffix, suffix_hash)
+
+    assert not get_stale_suffixes(train_dir, suffix_hashes)
+
+    # Only the changed lang suffix is re-trained
+    assert get_stale_suffixes(train_dir, {**suffix_hashes, "arpa_rescore": "0"}) == [
+        "arpa_rescore"
+    ]
+
+    remove_stamp(train_dir, "arpa")
+    assert get_stale_suffixes(train_dir, suffix_hashes) == ["arpa"]
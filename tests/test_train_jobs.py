@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import threading
+
+from wyoming_rhasspy_speech.train_jobs import TrainJob, TrainJobManager, TrainJobStatus
+
+_LOGGER = logging.getLogger("rhasspy_speech.test")
+
+
+def test_job_succeeds() -> None:
+    async def run_job(job: TrainJob) -> bool:
+        job.set_stage("training")
+        _LOGGER.warning("Training %s", job.model_id)
+        return True
+
+    manager = TrainJobManager(run_job)
+    job, is_new = manager.submit("en_US-rhasspy")
+    assert is_new
+
+    lines = list(job.iter_lines())
+    assert job.status == TrainJobStatus.SUCCEEDED
+    assert job.is_trained
+    assert "Stage: training" in lines
+    assert "Training en_US-rhasspy" in lines
+
+
+def test_duplicate_and_cancel() -> None:
+    started = threading.Event()
+
+    async def run_job(job: TrainJob) -> bool:
+        started.set()
+        await asyncio.sleep(60)
+        return True
+
+    manager = TrainJobManager(run_job, max_running=1)
+    job, _is_new = manager.submit("en_US-rhasspy", "kitchen")
+    assert started.wait(timeout=5)
+
+    # Same model is de-duplicated
+    same_job, is_new = manager.submit("en_US-rhasspy", "kitchen")
+    assert (same_job is job) and (not is_new)
+
+    # Other model waits for the running job
+    queued_job, is_new = manager.submit("de_DE-rhasspy")
+    assert is_new
+    assert queued_job.status == TrainJobStatus.QUEUED
+
+    assert manager.cancel(queued_job.id)
+    assert queued_job.status == TrainJobStatus.CANCELLED
+
+    assert manager.cancel(job.id)
+    list(job.iter_lines())
+    assert job.status == TrainJobStatus.CANCELLED
+    assert not manager.cancel(job.id)
+
+
+def test_job_fails() -> None:
+    async def run_job(job: TrainJob) -> bool:
+        raise ValueError("No intents")
+
+    manager = TrainJobManager(run_job)
+    job, _is_new = manager.submit("en_US-rhasspy")
+    list(job.iter_lines())
+
+    assert job.status == TrainJobStatus.FAILED
+    assert job.error == "No intents"
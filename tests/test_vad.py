@@ -0,0 +1,74 @@
+from wyoming_rhasspy_speech.vad import Endpointer, PauseDetector, SpeechTrimmer
+
+
+def test_endpoint_after_silence() -> None:
+    endpointer = Endpointer(threshold=0.5, min_speech_seconds=0.2, silence_seconds=0.3)
+
+    # Speech
+    for _ in range(3):
+        assert not endpointer.process(0.9, 0.1)
+
+    # Silence
+    assert not endpointer.process(0.1, 0.1)
+    assert not endpointer.process(0.1, 0.1)
+    assert endpointer.process(0.1, 0.1)
+
+
+def test_min_speech() -> None:
+    endpointer = Endpointer(threshold=0.5, min_speech_seconds=0.5, silence_seconds=0.1)
+
+    # Not enough speech to end
+    assert not endpointer.process(0.9, 0.1)
+    assert not endpointer.process(0.1, 0.1)
+    assert not endpointer.process(0.1, 0.1)
+
+
+def test_max_seconds() -> None:
+    endpointer = Endpointer(
+        threshold=0.5, min_speech_seconds=0.1, silence_seconds=1.0, max_seconds=0.3
+    )
+
+    assert not endpointer.process(0.9, 0.1)
+    assert not endpointer.process(0.9, 0.1)
+    assert endpointer.process(0.9, 0.1)
+
+    endpointer.reset()
+    assert not endpointer.process(0.9, 0.1)
+
+
+def test_pause() -> None:
+    detector = PauseDetector(threshold=0.5, pause_seconds=0.2)
+
+    assert not detector.process(0.9, 0.1)
+    assert not detector.process(0.1, 0.1)
+    assert detector.process(0.1, 0.1)
+    assert detector.is_paused
+
+    # Only reported once per pause
+    assert not detector.process(0.1, 0.1)
+
+    # Speech ends the pause
+    assert not detector.process(0.9, 0.1)
+    assert not detector.is_paused
+    assert not detector.process(0.1, 0.1)
+    assert detector.process(0.1, 0.1)
+
+
+def test_speech_trimmer() -> None:
+    trimmer = SpeechTrimmer(threshold=0.5, padding_seconds=0.1)
+
+    # No speech yet
+    assert trimmer.get_bounds(0.0, 1.0) == (0.0, 1.0)
+
+    # 0.5s silence, 0.3s speech, 0.5s silence
+    for speech_prob in [0.1] * 5 + [0.9] * 3 + [0.1] * 5:
+        trimmer.process(speech_prob, 0.1)
+
+    start, end = trimmer.get_bounds(0.0, 1.3)
+    assert round(start, 2) == 0.4
+    assert round(end, 2) == 0.9
+
+    # Audio begins after the start of the stream
+    start, end = trimmer.get_bounds(0.45, 0.85)
+    assert round(start, 2) == 0.0
+    assert round(end, 2) == 0.45
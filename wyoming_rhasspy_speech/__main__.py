@@ -1,37 +1,48 @@
 #!/usr/bin/env python3
 import argparse
-import array
 import asyncio
 import logging
+import os
 import shutil
 import tarfile
 import tempfile
 import time
 import wave
-from collections import defaultdict
 from functools import partial
 from pathlib import Path
 from threading import Thread
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple, Union
 from urllib.request import urlopen
 
 from pyring_buffer import RingBuffer
 from pysilero_vad import SileroVoiceActivityDetector
-from pyspeex_noise import AudioProcessor as SpeexAudioProcessor
 from rhasspy_speech.const import LangSuffix
 from rhasspy_speech.coqui_stt import CoquiSttTranscriber
-from rhasspy_speech.tools import KaldiTools
 from rhasspy_speech.transcribe_stream import KaldiNnet3StreamTranscriber
-from rhasspy_speech.transcribe_wav import KaldiNnet3WavTranscriber
 from wyoming.asr import Transcribe, Transcript
-from wyoming.audio import AudioChunk, AudioChunkConverter, AudioStart, AudioStop
+from wyoming.audio import AudioChunk, AudioStart, AudioStop
 from wyoming.event import Event
-from wyoming.info import AsrModel, AsrProgram, Attribution, Describe, Info
+from wyoming.info import Describe, Info
 from wyoming.server import AsyncEventHandler, AsyncServer
 
+from .audio import (
+    AudioBuffer,
+    PcmConverter,
+    SpeexSession,
+    multiply_volume,
+    process_frames,
+)
+from .audio_queue import AudioQueue, AudioQueueOverflowError, OverflowPolicy
+from .batch_train import train_models
+from .decoder import DecoderKey, KaldiTranscriber, create_transcriber
+from .events import PartialTranscript
+from .metrics import UtteranceStats
 from .models import MODELS, Model
-from .shared import AppSettings, AppState
-from .web_server import get_app, load_responses, train_model, write_exposed
+from .scheduler import DecodeRejectedError, QueuePolicy
+from .shared import VAD_KEY, AppSettings, AppState, split_model_name
+from .vad import Endpointer, PauseDetector, SpeechTrimmer
+from .warmup import get_warmup_models, warm_up
+from .web_server import get_app, load_responses, write_exposed
 
 _LOGGER = logging.getLogger()
 _DIR = Path(__file__).parent
@@ -40,6 +51,7 @@ RATE = 16000
 WIDTH = 2
 CHANNELS = 1
 BYTES_10MS = 320
+BYTES_PER_SECOND = RATE * WIDTH * CHANNELS
 
 
 async def main() -> None:
@@ -100,6 +112,46 @@ async def main() -> None:
         default=0.7,
         help="Seconds of audio to keep before speech is detected (default: 0.7)",
     )
+    parser.add_argument(
+        "--endpoint",
+        action="store_true",
+        help="Send transcript when VAD detects the end of speech instead of waiting for audio-stop",
+    )
+    parser.add_argument(
+        "--endpoint-min-speech-seconds",
+        type=float,
+        default=0.3,
+        help="Seconds of speech required before end of speech can be detected (default: 0.3)",
+    )
+    parser.add_argument(
+        "--endpoint-silence-seconds",
+        type=float,
+        default=0.7,
+        help="Seconds of silence after speech that ends the utterance (default: 0.7)",
+    )
+    parser.add_argument(
+        "--endpoint-max-seconds",
+        type=float,
+        default=15.0,
+        help="Maximum seconds of audio after speech starts, 0 for no limit (default: 15)",
+    )
+    parser.add_argument(
+        "--trim-silence",
+        action="store_true",
+        help="Trim non-speech audio before and after speech before decoding without --streaming",
+    )
+    parser.add_argument(
+        "--trim-silence-padding",
+        type=float,
+        default=0.3,
+        help="Seconds of audio to keep around speech with --trim-silence (default: 0.3)",
+    )
+    parser.add_argument(
+        "--speculative-pause-seconds",
+        type=float,
+        default=0.0,
+        help="Start decoding when VAD detects a pause this long without --streaming, 0 to disable (default: 0)",
+    )
     # Speex
     parser.add_argument(
         "--speex", action="store_true", help="Enable audio cleaning with Speex"
@@ -116,6 +168,12 @@ async def main() -> None:
         default=4000,
         help="Auto gain level (default: 4000)",
     )
+    parser.add_argument(
+        "--audio-pool-size",
+        type=int,
+        default=4,
+        help="Number of idle VAD/Speex sessions shared by clients (default: 4)",
+    )
     # Edit distance
     parser.add_argument("--max-fuzzy-cost", type=float, default=3.0)
     # Transcribers
@@ -125,6 +183,89 @@ async def main() -> None:
     parser.add_argument("--beam", type=float, default=24.0)
     parser.add_argument("--nbest", type=int, default=3)
     parser.add_argument("--streaming", action="store_true")
+    parser.add_argument(
+        "--audio-queue-seconds",
+        type=float,
+        default=10.0,
+        help="Seconds of audio each client may queue for the streaming decoder, 0 for no limit (default: 10)",
+    )
+    parser.add_argument(
+        "--audio-queue-policy",
+        choices=[p.value for p in OverflowPolicy],
+        default=OverflowPolicy.BLOCK.value,
+        help="What to do when the streaming audio queue is full (default: block)",
+    )
+    parser.add_argument(
+        "--audio-buffer-seconds",
+        type=float,
+        default=60.0,
+        help="Seconds of audio buffered for decoding per utterance, 0 for no limit (default: 60)",
+    )
+    parser.add_argument(
+        "--audio-buffer-policy",
+        choices=[OverflowPolicy.DROP_OLDEST.value, OverflowPolicy.ABORT.value],
+        default=OverflowPolicy.ABORT.value,
+        help="What to do when the audio buffer is full: drop the oldest audio or end the utterance (default: abort)",
+    )
+    parser.add_argument(
+        "--stream-frame-seconds",
+        type=float,
+        default=0.1,
+        help="Group streaming audio into frames this long before decoding, 0 to pass chunks through (default: 0.1)",
+    )
+    parser.add_argument(
+        "--partial-interval",
+        type=float,
+        default=0.0,
+        help="Send partial transcripts after this many seconds of new audio with --streaming, 0 to disable (default: 0)",
+    )
+    parser.add_argument(
+        "--decode-wav-file",
+        action="store_true",
+        help="Write non-streaming audio to a temporary WAV file instead of piping it to the decoder",
+    )
+    parser.add_argument(
+        "--coqui-pool-size",
+        type=int,
+        default=1,
+        help="Number of idle Coqui STT processes to keep per model (default: 1)",
+    )
+    parser.add_argument(
+        "--coqui-idle-timeout",
+        type=float,
+        default=600.0,
+        help="Seconds before an idle Coqui STT process is stopped, 0 to disable (default: 600)",
+    )
+    # Decode scheduler
+    parser.add_argument(
+        "--max-concurrent-decodes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Maximum number of decodes running at once, 0 for no limit (default: CPU count)",
+    )
+    parser.add_argument(
+        "--decode-queue-policy",
+        choices=[p.value for p in QueuePolicy],
+        default=QueuePolicy.FIFO.value,
+        help="Order of waiting decodes: fifo or shortest audio first (default: fifo)",
+    )
+    parser.add_argument(
+        "--max-queued-decodes",
+        type=int,
+        help="Reject decodes when this many are already waiting",
+    )
+    parser.add_argument(
+        "--degrade-queued-decodes",
+        type=int,
+        help="Use --degraded-beam/--degraded-max-active when this many decodes are waiting",
+    )
+    parser.add_argument("--degraded-max-active", type=int, default=3500)
+    parser.add_argument("--degraded-beam", type=float, default=12.0)
+    parser.add_argument(
+        "--decode-timeout",
+        type=float,
+        help="Seconds a decode may wait for a slot; non-streaming decodes must also finish in this time",
+    )
     #
     parser.add_argument(
         "--decode-mode",
@@ -132,9 +273,39 @@ async def main() -> None:
         default="arpa",
     )
     parser.add_argument("--arpa-rescore-order", type=int, default=5)
+    parser.add_argument(
+        "--catalog-check-seconds",
+        type=float,
+        default=60.0,
+        help="Seconds between checks for changed model directories, 0 to disable (default: 60)",
+    )
     #
     parser.add_argument(
-        "--auto-train", help="Model id to automatically download and train"
+        "--auto-train",
+        nargs="+",
+        help="Model ids to automatically download and train (e.g., en_US-rhasspy or en_US-rhasspy/suffix)",
+    )
+    parser.add_argument(
+        "--train-workers",
+        type=int,
+        default=0,
+        help="Models to train at the same time, 0 for one per CPU (default: 0)",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Prefetch files and decode silence with each language's model at startup",
+    )
+    parser.add_argument(
+        "--warmup-model",
+        action="append",
+        default=[],
+        help="Model to warm up instead of each language's model (e.g., en_US-rhasspy or en_US-rhasspy/suffix)",
+    )
+    parser.add_argument(
+        "--warmup-background",
+        action="store_true",
+        help="Warm up models after the server is ready",
     )
     #
     parser.add_argument(
@@ -163,10 +334,25 @@ async def main() -> None:
             vad_enabled=(not args.no_vad),
             vad_threshold=args.vad_threshold,
             before_speech_seconds=args.before_speech_seconds,
+            endpoint_enabled=args.endpoint,
+            endpoint_min_speech_seconds=args.endpoint_min_speech_seconds,
+            endpoint_silence_seconds=args.endpoint_silence_seconds,
+            endpoint_max_seconds=(
+                args.endpoint_max_seconds if args.endpoint_max_seconds > 0 else None
+            ),
+            trim_silence_padding=(
+                args.trim_silence_padding if args.trim_silence else None
+            ),
+            speculative_pause_seconds=(
+                args.speculative_pause_seconds
+                if args.speculative_pause_seconds > 0
+                else None
+            ),
             # Speex
             speex_enabled=args.speex,
             speex_noise_suppression=args.speex_noise_suppression,
             speex_auto_gain=args.speex_auto_gain,
+            audio_pool_size=args.audio_pool_size,
             # Edit distance
             max_fuzzy_cost=args.max_fuzzy_cost,
             # Transcribers
@@ -176,20 +362,62 @@ async def main() -> None:
             beam=args.beam,
             nbest=args.nbest if args.decode_mode != "grammar" else 1,
             streaming=args.streaming,
+            decode_wav_file=args.decode_wav_file,
+            audio_queue_seconds=(
+                args.audio_queue_seconds if args.audio_queue_seconds > 0 else None
+            ),
+            audio_queue_policy=OverflowPolicy(args.audio_queue_policy),
+            audio_buffer_seconds=(
+                args.audio_buffer_seconds if args.audio_buffer_seconds > 0 else None
+            ),
+            audio_buffer_policy=OverflowPolicy(args.audio_buffer_policy),
+            stream_frame_seconds=(
+                args.stream_frame_seconds if args.stream_frame_seconds > 0 else None
+            ),
+            partial_interval=(
+                args.partial_interval if args.partial_interval > 0 else None
+            ),
             #
             decode_mode=LangSuffix(args.decode_mode),
             arpa_rescore_order=args.arpa_rescore_order,
+            # Decode scheduler
+            max_concurrent_decodes=(
+                args.max_concurrent_decodes if args.max_concurrent_decodes > 0 else None
+            ),
+            decode_queue_policy=QueuePolicy(args.decode_queue_policy),
+            max_queued_decodes=args.max_queued_decodes,
+            degrade_queued_decodes=args.degrade_queued_decodes,
+            degraded_max_active=args.degraded_max_active,
+            degraded_beam=args.degraded_beam,
+            decode_timeout=args.decode_timeout,
+            # Coqui STT processes
+            coqui_pool_size=args.coqui_pool_size,
+            coqui_idle_timeout=(
+                args.coqui_idle_timeout if args.coqui_idle_timeout > 0 else None
+            ),
             # Home Assistant
             hass_token=args.hass_token,
             hass_websocket_uri=args.hass_websocket_uri,
             hass_ingress=args.hass_ingress,
             hass_auto_train=args.hass_auto_train,
             hass_builtin_intents=(not args.no_hass_builtin_intents),
+            # Training
+            train_workers=args.train_workers if args.train_workers > 0 else None,
             # Misc
             model_id_for_language=dict(args.model_for_language),
+            catalog_check_seconds=(
+                args.catalog_check_seconds if args.catalog_check_seconds > 0 else None
+            ),
         )
     )
 
+    # Load VAD/Speex sessions before clients connect
+    if state.settings.vad_enabled:
+        state.vad_pool.preload(VAD_KEY)
+
+    if state.settings.speex_enabled:
+        state.speex_pool.preload(state.settings.speex_key)
+
     # Add default models for languages
     for model in MODELS.values():
         if model.language_code not in state.settings.model_id_for_language:
@@ -199,87 +427,39 @@ async def main() -> None:
             state.settings.model_id_for_language[model.language_family] = model.id
 
     if args.auto_train:
-        model: Optional[Model] = None
-        for model_id, maybe_model in MODELS.items():
-            if model_id.startswith(args.auto_train):
-                model = maybe_model
-                break
-
-        if model is not None:
-            state.settings.auto_train_model_id = model.id
-
-            # Download model
-            model_data_dir = state.settings.model_data_dir(model.id)
-            if not model_data_dir.exists():
-                try:
-                    _LOGGER.info("Downloading %s", model.url)
-                    with urlopen(
-                        model.url
-                    ) as model_response, tempfile.TemporaryDirectory() as temp_dir:
-                        model_path = Path(temp_dir) / "model.tar.gz"
-                        with open(model_path, "wb") as model_tar_file:
-                            shutil.copyfileobj(model_response, model_tar_file)
-
-                        _LOGGER.debug("Extracting %s", model_path)
-                        state.settings.models_dir.mkdir(parents=True, exist_ok=True)
-                        with tarfile.open(model_path, "r:gz") as model_tar_file:
-                            model_tar_file.extractall(state.settings.models_dir)
-                except Exception:
-                    _LOGGER.exception(
-                        "Unexpected error while downloading/extracting model"
-                    )
-                    shutil.rmtree(model_data_dir)
-            else:
-                _LOGGER.debug("[Auto train] model already downloaded: %s", model.id)
-
-            # Download HA entities
-            force_retrain = False
-            if state.settings.hass_auto_train:
-                lists_path = state.settings.lists_path(model.id)
-                if not lists_path.exists():
-                    if state.settings.hass_token:
-                        _LOGGER.info(
-                            "Downloading Home Assistant entities from %s",
-                            state.settings.hass_websocket_uri,
-                        )
-                        try:
-                            lists_path.parent.mkdir(parents=True, exist_ok=True)
-                            with open(lists_path, "w", encoding="utf-8") as lists_file:
-                                await write_exposed(state, lists_file)
+        train_jobs: List[Tuple[str, Optional[str]]] = []
+        for auto_train_name in args.auto_train:
+            auto_train_id, auto_train_suffix = split_model_name(auto_train_name)
+            model: Optional[Model] = None
+            for model_id, maybe_model in MODELS.items():
+                if model_id.startswith(auto_train_id):
+                    model = maybe_model
+                    break
+
+            if model is None:
+                _LOGGER.warning("Can't auto train. No model for %s", auto_train_name)
+                continue
 
-                            _LOGGER.debug(
-                                "Downloaded Home Assistant entities. Will re-train."
-                            )
-                            force_retrain = True
-                        except Exception:
-                            _LOGGER.exception(
-                                "Unexpected error while downloading Home Assistant entities"
-                            )
-                            lists_path.unlink(missing_ok=True)
-                    else:
-                        _LOGGER.warning(
-                            "Can't download Home Assistant entities without --hass-token"
-                        )
-                else:
-                    _LOGGER.debug(
-                        "[Auto train] Home Assistant entities already downloaded."
-                    )
+            if state.settings.auto_train_model_id is None:
+                state.settings.auto_train_model_id = model.id
 
-            # Train model
-            model_train_dir = state.settings.model_train_dir(model.id)
-            model_lang_dir = (
-                model_train_dir / "data" / f"lang_{state.settings.decode_mode.value}"
-            )
-            if force_retrain or (not model_lang_dir.exists()):
-                try:
-                    _LOGGER.debug("Auto training: %s", model.id)
-                    await train_model(state, model.id)
-                except Exception:
-                    _LOGGER.exception("Unexpected error while training")
-            else:
-                _LOGGER.debug("[Auto train] model already trained: %s", model.id)
+            await prepare_auto_train(state, model, auto_train_suffix)
+            train_jobs.append((model.id, auto_train_suffix))
+
+        # Models are skipped if sentences, lists, and model are unchanged
+        await train_models(
+            state,
+            train_jobs,
+            max_workers=state.settings.train_workers,
+        )
+
+    warmup_task: Optional[asyncio.Task] = None
+    if args.warmup or args.warmup_model:
+        warmup_models = get_warmup_models(state, args.warmup_model)
+        if args.warmup_background:
+            warmup_task = asyncio.create_task(warm_up(state, warmup_models))
         else:
-            _LOGGER.warning("Can't auto train. No model for %s", args.auto_train)
+            await warm_up(state, warmup_models)
 
     # Run Flask server in a separate thread
     flask_app = get_app(state)
@@ -302,6 +482,66 @@ async def main() -> None:
         await wyoming_server.run(partial(RhasspySpeechEventHandler, args, state))
     except KeyboardInterrupt:
         pass
+    finally:
+        if warmup_task is not None:
+            warmup_task.cancel()
+
+
+# -----------------------------------------------------------------------------
+
+
+async def prepare_auto_train(
+    state: AppState, model: Model, suffix: Optional[str] = None
+) -> None:
+    """Download a model and Home Assistant entities if they're missing."""
+    # Download model
+    model_data_dir = state.settings.model_data_dir(model.id)
+    if not model_data_dir.exists():
+        try:
+            _LOGGER.info("Downloading %s", model.url)
+            with urlopen(
+                model.url
+            ) as model_response, tempfile.TemporaryDirectory() as temp_dir:
+                model_path = Path(temp_dir) / "model.tar.gz"
+                with open(model_path, "wb") as model_tar_file:
+                    shutil.copyfileobj(model_response, model_tar_file)
+
+                _LOGGER.debug("Extracting %s", model_path)
+                state.settings.models_dir.mkdir(parents=True, exist_ok=True)
+                with tarfile.open(model_path, "r:gz") as model_tar_file:
+                    model_tar_file.extractall(state.settings.models_dir)
+        except Exception:
+            _LOGGER.exception("Unexpected error while downloading/extracting model")
+            shutil.rmtree(model_data_dir)
+    else:
+        _LOGGER.debug("[Auto train] model already downloaded: %s", model.id)
+
+    # Download HA entities
+    if state.settings.hass_auto_train:
+        lists_path = state.settings.lists_path(model.id, suffix)
+        if not lists_path.exists():
+            if state.settings.hass_token:
+                _LOGGER.info(
+                    "Downloading Home Assistant entities from %s",
+                    state.settings.hass_websocket_uri,
+                )
+                try:
+                    lists_path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(lists_path, "w", encoding="utf-8") as lists_file:
+                        await write_exposed(state, lists_file)
+
+                    _LOGGER.debug("Downloaded Home Assistant entities")
+                except Exception:
+                    _LOGGER.exception(
+                        "Unexpected error while downloading Home Assistant entities"
+                    )
+                    lists_path.unlink(missing_ok=True)
+            else:
+                _LOGGER.warning(
+                    "Can't download Home Assistant entities without --hass-token"
+                )
+        else:
+            _LOGGER.debug("[Auto train] Home Assistant entities already downloaded.")
 
 
 # -----------------------------------------------------------------------------
@@ -321,61 +561,112 @@ class RhasspySpeechEventHandler(AsyncEventHandler):
 
         self.cli_args = cli_args
         self.client_id = str(time.monotonic_ns())
-        self.converter = AudioChunkConverter(rate=RATE, width=WIDTH, channels=CHANNELS)
+        self.converter = PcmConverter(RATE)
 
         self.model_id: Optional[str] = None
         self.model_suffix: Optional[str] = None
         self.model_train_dir: Optional[Path] = None
         self.model_data_dir: Optional[Path] = None
         self.state = state
-        self.transcriber: Optional[KaldiNnet3WavTranscriber] = None
         self.transcribe_task: Optional[asyncio.Task] = None
+
+        # Checked out from shared pool on audio-start
+        self.is_coqui = False
         self.coqui_transcriber: Optional[CoquiSttTranscriber] = None
 
         settings = self.state.settings
 
         self.is_streaming = self.state.settings.streaming
-        if self.state.settings.decode_mode == LangSuffix.GRAMMAR:
-            # Strict grammar
-            self.graph_dir_name = "graph_grammar"
-        else:
-            # Language model
-            self.graph_dir_name = "graph_arpa"
 
         # Non-streaming
-        self.audio_buffer = bytes()
+        audio_buffer_max_bytes: Optional[int] = None
+        if settings.audio_buffer_seconds is not None:
+            audio_buffer_max_bytes = (
+                int(settings.audio_buffer_seconds * RATE) * WIDTH * CHANNELS
+            )
+
+        self.audio_buffer = AudioBuffer(
+            RATE * WIDTH * CHANNELS * 5, max_bytes=audio_buffer_max_bytes
+        )
 
         # Streaming
-        self.audio_queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+        self.audio_queue = self.create_audio_queue()
+
+        # Partial transcripts (streaming audio is also kept in audio_buffer)
+        self.partial_interval: Optional[float] = None
+        if settings.streaming:
+            self.partial_interval = settings.partial_interval
+
+        self.partial_task: Optional[asyncio.Task] = None
+        self.partial_audio_seconds = 0.0
+        self.partial_text = ""
 
         # Audio
         self.volume_multiplier: Optional[float] = None
         if settings.volume_multiplier != 1.0:
             self.volume_multiplier = settings.volume_multiplier
 
-        # VAD
+        # Timings and counts for the current utterance
+        self.stats = UtteranceStats()
+
+        # VAD (checked out from shared pool on audio-start)
         self.vad: Optional[SileroVoiceActivityDetector] = None
         self.vad_bytes_per_chunk: int = 0
-        self.vad_buffer = bytes()
+        self.vad_seconds_per_chunk: float = 0.0
+        self.vad_buffer = AudioBuffer()
         self.vad_threshold = settings.vad_threshold
         self.before_speech_seconds = settings.before_speech_seconds
         self.before_speech_buffer: Optional[RingBuffer] = None
         if settings.vad_enabled:
-            self.vad = SileroVoiceActivityDetector()
-            self.vad_bytes_per_chunk = self.vad.chunk_bytes()
             self.before_speech_buffer = RingBuffer(
                 int(self.before_speech_seconds * RATE * WIDTH * CHANNELS)
             )
         self.is_speech_started = False
 
-        # Speex
-        self.speex: Optional[SpeexAudioProcessor] = None
-        self.speex_audio_buffer = bytes()
-        if settings.speex_enabled:
-            self.speex = SpeexAudioProcessor(
-                settings.speex_auto_gain, settings.speex_noise_suppression
+        # End of speech
+        self.endpointer: Optional[Endpointer] = None
+        if settings.vad_enabled and settings.endpoint_enabled:
+            self.endpointer = Endpointer(
+                threshold=settings.vad_threshold,
+                min_speech_seconds=settings.endpoint_min_speech_seconds,
+                silence_seconds=settings.endpoint_silence_seconds,
+                max_seconds=settings.endpoint_max_seconds,
+            )
+        self.is_utterance_finished = False
+
+        # Trim silence around speech in buffered audio
+        self.trimmer: Optional[SpeechTrimmer] = None
+        if (
+            settings.vad_enabled
+            and (not settings.streaming)
+            and (settings.trim_silence_padding is not None)
+        ):
+            self.trimmer = SpeechTrimmer(
+                threshold=settings.vad_threshold,
+                padding_seconds=settings.trim_silence_padding,
             )
 
+        # Seconds into the utterance where audio_buffer begins
+        self.buffer_offset_seconds = 0.0
+
+        # Speculative decode of buffered audio during a pause in speech
+        self.pause_detector: Optional[PauseDetector] = None
+        if (
+            settings.vad_enabled
+            and (not settings.streaming)
+            and (settings.speculative_pause_seconds is not None)
+        ):
+            self.pause_detector = PauseDetector(
+                threshold=settings.vad_threshold,
+                pause_seconds=settings.speculative_pause_seconds,
+            )
+        self.speculative_task: Optional[asyncio.Task] = None
+
+        # Speex (checked out from shared pool on audio-start)
+        self.speex: Optional[SpeexSession] = None
+        self.speex_audio_buffer = AudioBuffer()
+        self.speex_output_buffer = AudioBuffer()
+
     async def handle_event(self, event: Event) -> bool:
         if Describe.is_type(event.type):
             await self.write_event(self.get_info().event())
@@ -392,222 +683,144 @@ class RhasspySpeechEventHandler(AsyncEventHandler):
             self.model_data_dir = self.state.settings.model_data_dir(self.model_id)
 
             # Empty queue
-            self.audio_queue = asyncio.Queue()
+            self.audio_queue = self.create_audio_queue()
 
-            if self.coqui_transcriber is not None:
-                await self.coqui_transcriber.start_stream()
+            # Decode from a previous utterance that never stopped
+            self.cancel_transcribe_task()
+            self.cancel_partial_task()
+            self.cancel_speculative_task()
+            self.partial_audio_seconds = 0.0
+            self.partial_text = ""
+
+            if self.is_coqui:
+                # Worker from an utterance that never stopped
+                self.discard_coqui_transcriber()
+
+                self.coqui_transcriber = self.state.coqui_pool.acquire(self.model_id)
+                try:
+                    await self.coqui_transcriber.start_stream()
+                except Exception:
+                    self.discard_coqui_transcriber()
+                    raise
             elif self.is_streaming:
                 # Streaming audio
-                transcriber = KaldiNnet3StreamTranscriber(
-                    model_dir=self.model_data_dir,
-                    graph_dir=self.model_train_dir / self.graph_dir_name,
-                    tools=KaldiTools.from_tools_dir(self.state.settings.tools_dir),
-                    max_active=self.state.settings.max_active,
-                    lattice_beam=self.state.settings.lattice_beam,
-                    acoustic_scale=self.state.settings.acoustic_scale,
-                    beam=self.state.settings.beam,
+                audio_queue = self.audio_queue
+                self.transcribe_task = asyncio.create_task(
+                    self.decode(queue_stream(audio_queue))
                 )
 
-                if self.state.settings.decode_mode == LangSuffix.ARPA_RESCORE:
-                    # Streaming with rescoring
-                    self.transcribe_task = asyncio.create_task(
-                        transcriber.async_transcribe_rescore(
-                            self.audio_stream(),
-                            old_lang_dir=self.model_train_dir / "data" / "lang_arpa",
-                            new_lang_dir=self.model_train_dir
-                            / "data"
-                            / "lang_arpa_rescore",
-                            nbest=self.state.settings.nbest,
-                            max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
-                            require_fuzzy=True,
-                        )
-                    )
-                else:
-                    # Streaming without rescoring
-                    self.transcribe_task = asyncio.create_task(
-                        transcriber.async_transcribe(
-                            self.audio_stream(),
-                            lang_dir=self.model_train_dir
-                            / "data"
-                            / f"lang_{self.state.settings.decode_mode.value}",
-                            nbest=self.state.settings.nbest,
-                            max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
-                            require_fuzzy=True,
-                        )
-                    )
-            else:
-                # Non-streaming
-                self.transcriber = KaldiNnet3WavTranscriber(
-                    model_dir=self.model_data_dir,
-                    graph_dir=self.model_train_dir / self.graph_dir_name,
-                    tools=KaldiTools.from_tools_dir(self.state.settings.tools_dir),
-                    max_active=self.state.settings.max_active,
-                    lattice_beam=self.state.settings.lattice_beam,
-                    acoustic_scale=self.state.settings.acoustic_scale,
-                    beam=self.state.settings.beam,
+                # Don't block the client if the decoder stops early
+                self.transcribe_task.add_done_callback(
+                    lambda _task: audio_queue.close()
                 )
 
+            self.acquire_audio_processors()
+
             if self.vad is not None:
                 # Reset VAD
-                self.vad.reset()
-                self.vad_buffer = bytes()
+                self.vad_buffer.clear()
                 self.before_speech_buffer = RingBuffer(
                     int(self.before_speech_seconds * RATE * WIDTH * CHANNELS)
                 )
                 self.is_speech_started = False
-                self.speex_audio_buffer = bytes()
 
-            self.audio_buffer = bytes()
+            if self.endpointer is not None:
+                self.endpointer.reset()
+
+            if self.pause_detector is not None:
+                self.pause_detector.reset()
+
+            if self.trimmer is not None:
+                self.trimmer.reset()
+
+            self.buffer_offset_seconds = 0.0
+
+            self.is_utterance_finished = False
+            self.converter.reset()
+            self.speex_audio_buffer.clear()
+            self.speex_output_buffer.clear()
+            self.audio_buffer.clear()
+            self.stats = UtteranceStats()
 
         elif AudioChunk.is_type(event.type):
-            chunk = AudioChunk.from_event(event)
-            chunk = self.converter.convert(chunk)
+            if self.is_utterance_finished:
+                # Transcript was already sent after end of speech
+                return True
+
+            with self.stats.measure("convert"):
+                chunk = AudioChunk.from_event(event)
+                audio = self.converter.convert(
+                    chunk.audio, chunk.rate, chunk.width, chunk.channels
+                )
+
+                if self.volume_multiplier is not None:
+                    audio, num_clipped = multiply_volume(audio, self.volume_multiplier)
+                    self.stats.num_clipped_samples += num_clipped
 
-            if self.volume_multiplier is not None:
-                chunk.audio = multiply_volume(chunk.audio, self.volume_multiplier)
+            self.stats.audio_seconds += len(audio) / BYTES_PER_SECOND
 
             if (self.vad is None) or self.is_speech_started:
                 if self.speex is not None:
                     # Clean audio with speex
-                    self.speex_audio_buffer += chunk.audio
-                    audio_to_transcribe = bytes()
-                    audio_idx = 0
-                    while (audio_idx + BYTES_10MS) < len(self.speex_audio_buffer):
-                        audio_to_transcribe += self.speex.Process10ms(
-                            self.speex_audio_buffer[audio_idx : audio_idx + BYTES_10MS]
-                        ).audio
-                        audio_idx += BYTES_10MS
-
-                    self.speex_audio_buffer = self.speex_audio_buffer[audio_idx:]
+                    speex = self.speex
+                    self.speex_audio_buffer.write(audio)
+                    with self.stats.measure("speex"):
+                        process_frames(
+                            speex.process_10ms,
+                            self.speex_audio_buffer,
+                            self.speex_output_buffer,
+                            BYTES_10MS,
+                        )
+                    audio_to_transcribe = self.speex_output_buffer.read()
                 else:
                     # Not cleaned
                     if self.speex_audio_buffer:
-                        audio_to_transcribe = self.speex_audio_buffer + chunk.audio
-                        self.speex_audio_buffer = bytes()
+                        self.speex_audio_buffer.write(audio)
+                        audio_to_transcribe = self.speex_audio_buffer.read()
                     else:
-                        audio_to_transcribe = chunk.audio
+                        audio_to_transcribe = audio
 
                 if audio_to_transcribe:
                     if self.coqui_transcriber is not None:
                         await self.coqui_transcriber.process_chunk(audio_to_transcribe)
                     elif self.is_streaming:
-                        self.audio_queue.put_nowait(audio_to_transcribe)
-                    else:
-                        self.audio_buffer += audio_to_transcribe
+                        try:
+                            await self.audio_queue.put(audio_to_transcribe)
+                        except AudioQueueOverflowError as err:
+                            _LOGGER.warning(
+                                "Aborting utterance for client %s: %s",
+                                self.client_id,
+                                err,
+                            )
+                            await self.finish_utterance()
+                            return True
+
+                        if self.partial_interval is not None:
+                            if not await self.buffer_audio(audio_to_transcribe):
+                                return True
+
+                            self.start_partial_task()
+                    elif not await self.buffer_audio(audio_to_transcribe):
+                        return True
+
+                if self.needs_vad_after_speech and self.process_vad(audio):
+                    _LOGGER.debug(
+                        "End of speech detected for client %s", self.client_id
+                    )
+                    await self.finish_utterance()
             else:
                 # VAD
                 if self.before_speech_buffer is not None:
-                    self.before_speech_buffer.put(chunk.audio)
+                    self.before_speech_buffer.put(audio)
 
                 # Detect start of speech
-                self.vad_buffer += chunk.audio
-                while len(self.vad_buffer) >= self.vad_bytes_per_chunk:
-                    vad_chunk = self.vad_buffer[: self.vad_bytes_per_chunk]
-                    speech_prob = self.vad.process_chunk(vad_chunk)
-                    if speech_prob > self.vad_threshold:
-                        self.is_speech_started = True
-
-                        # Buffered audio will be cleaned when next chunk arrives
-                        if self.before_speech_buffer is not None:
-                            self.speex_audio_buffer += (
-                                self.before_speech_buffer.getvalue()
-                            )
-
-                        break
-
-                    self.vad_buffer = self.vad_buffer[self.vad_bytes_per_chunk :]
+                self.process_vad(audio)
 
         elif AudioStop.is_type(event.type):
-            assert self.model_id
-            assert self.model_train_dir is not None
-            assert self.model_data_dir is not None
-
-            start_time = time.monotonic()
-            texts: List[str] = []
-
-            try:
-                if self.coqui_transcriber is not None:
-                    probs = await self.coqui_transcriber.finish_stream()
-                    texts = [
-                        await self.coqui_transcriber.decode_probs(
-                            probs, self.model_train_dir
-                        )
-                    ]
-                elif self.is_streaming:
-                    assert self.transcribe_task is not None
+            if not self.is_utterance_finished:
+                await self.finish_utterance()
 
-                    # End stream and get transcript(s)
-                    self.audio_queue.put_nowait(None)
-                    texts = await self.transcribe_task
-                else:
-                    assert self.transcriber is not None
-
-                    with tempfile.NamedTemporaryFile("wb+", suffix=".wav") as temp_file:
-                        wav_path = temp_file.name
-                        wav_writer: wave.Wave_write = wave.open(wav_path, "wb")
-                        with wav_writer:
-                            wav_writer.setframerate(16000)
-                            wav_writer.setsampwidth(2)
-                            wav_writer.setnchannels(1)
-                            wav_writer.writeframes(self.audio_buffer)
-
-                        if self.state.settings.decode_mode == LangSuffix.ARPA_RESCORE:
-                            texts = await self.transcriber.async_transcribe_rescore(
-                                wav_path,
-                                old_lang_dir=self.model_train_dir
-                                / "data"
-                                / "lang_arpa",
-                                new_lang_dir=self.model_train_dir
-                                / "data"
-                                / "lang_arpa_rescore",
-                                nbest=self.state.settings.nbest,
-                                max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
-                                require_fuzzy=True,
-                            )
-                        else:
-                            texts = await self.transcriber.async_transcribe(
-                                wav_path,
-                                self.model_train_dir
-                                / "data"
-                                / f"lang_{self.state.settings.decode_mode.value}",
-                                nbest=self.state.settings.nbest,
-                                max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
-                                require_fuzzy=True,
-                            )
-            except Exception:
-                _LOGGER.exception("Unexpected error getting transcripts")
-            finally:
-                self.transcribe_task = None
-                self.transcriber = None
-
-            _LOGGER.debug(
-                "Transcripts for client %s in %s second(s): %s",
-                self.client_id,
-                time.monotonic() - start_time,
-                texts,
-            )
-
-            text = ""
-            if texts:
-                text = texts[0].strip()
-
-            if not text:
-                # Use custom response if available
-                if self.model_id not in self.state.unknown_sentence_responses:
-                    try:
-                        # Reload responses
-                        load_responses(self.state, self.model_id)
-                    except Exception:
-                        _LOGGER.exception("Unexpected error loading responses")
-
-                text = self.state.unknown_sentence_responses.get(self.model_id, "")
-
-            _LOGGER.debug("Final text: %s", text)
-            await self.write_event(Transcript(text=text).event())
-
-            if self.coqui_transcriber is not None:
-                await self.coqui_transcriber.stop()
-                self.coqui_transcriber = None
+            self.is_utterance_finished = False
 
             return True
         elif Transcribe.is_type(event.type):
@@ -619,25 +832,16 @@ class RhasspySpeechEventHandler(AsyncEventHandler):
             _LOGGER.debug(transcribe)
 
             if transcribe.name:
-                name_parts = transcribe.name.split("/", maxsplit=1)
-                if len(name_parts) == 2:
-                    self.model_id, self.model_suffix = name_parts
-                else:
-                    self.model_id, self.model_suffix = transcribe.name, None
+                self.model_id, self.model_suffix = split_model_name(transcribe.name)
             elif transcribe.language:
                 self.model_id = self.state.settings.model_id_for_language.get(
                     transcribe.language
                 )
                 if not self.model_id:
-                    # Find the first one that matches the prefix
-                    for model in sorted(
-                        self.get_info().asr[0].models,
-                        key=lambda m: len(m.name),
-                        reverse=True,
-                    ):
-                        if model.name.startswith(transcribe.language):
-                            self.model_id = model.name
-                            break
+                    # Find the longest one that matches the prefix
+                    self.model_id = self.state.model_catalog.model_for_language(
+                        transcribe.language
+                    )
 
                 _LOGGER.debug(
                     "Selected model %s for language %s",
@@ -647,111 +851,593 @@ class RhasspySpeechEventHandler(AsyncEventHandler):
 
             assert self.model_id is not None
             model_config = self.state.settings.model_config(self.model_id)
-            if model_config.get("type") == "coqui":
-                self.coqui_transcriber = CoquiSttTranscriber(
-                    model_dir=self.state.settings.model_data_dir(self.model_id),
-                    exe_path=self.state.settings.tools_dir / "stt_onlyprobs",
-                    tools=KaldiTools.from_tools_dir(self.state.settings.tools_dir),
-                )
+            self.is_coqui = model_config.get("type") == "coqui"
         else:
             _LOGGER.debug("Unexpected event: type=%s, data=%s", event.type, event.data)
 
         return True
 
-    async def audio_stream(self):
-        while True:
-            chunk = await self.audio_queue.get()
-            if chunk is None:
-                break
+    async def finish_utterance(self) -> None:
+        """Get transcript for buffered audio and send it to the client."""
+        assert self.model_id
+        assert self.model_train_dir is not None
+        assert self.model_data_dir is not None
 
-            yield chunk
+        start_time = time.monotonic()
+        self.stats.add("buffering", start_time - self.stats.start_time)
+        self.cancel_partial_task()
+        texts: List[str] = []
 
-    async def disconnect(self) -> None:
-        pass
+        try:
+            # Streaming decodes run while audio arrives, so only the time
+            # after the audio ends is measured.
+            if self.coqui_transcriber is not None:
+                with self.stats.measure("finalize"):
+                    texts = await self.finish_coqui()
+            elif self.is_streaming:
+                assert self.transcribe_task is not None
 
-    def get_info(self) -> Info:
-        # [(model_id, suffix)]
-        suffix: Optional[str]
-        trained_models: List[Tuple[str, Optional[str]]] = []
+                # End stream and get transcript(s)
+                self.audio_queue.close()
+                with self.stats.measure("finalize"):
+                    texts = await self.transcribe_task
+            else:
+                texts = await self.decode_buffered()
+        except DecodeRejectedError as err:
+            _LOGGER.warning("Decode rejected for client %s: %s", self.client_id, err)
+        except AudioQueueOverflowError:
+            _LOGGER.warning("Audio queue overflowed for client %s", self.client_id)
+        except asyncio.TimeoutError:
+            _LOGGER.warning("Decode timed out for client %s", self.client_id)
+        except Exception:
+            _LOGGER.exception("Unexpected error getting transcripts")
+        finally:
+            self.transcribe_task = None
+            self.cancel_speculative_task()
+
+        if self.is_streaming:
+            self.observe_audio_queue()
+
+        _LOGGER.debug(
+            "Transcripts for client %s in %s second(s): %s",
+            self.client_id,
+            time.monotonic() - start_time,
+            texts,
+        )
 
-        for model_dir in self.state.settings.models_dir.iterdir():
-            if not model_dir.is_dir():
-                continue
+        if self.stats.num_clipped_samples > 0:
+            _LOGGER.debug(
+                "Clipped %s sample(s) for client %s after volume multiplier",
+                self.stats.num_clipped_samples,
+                self.client_id,
+            )
 
-            model_id = model_dir.name
-            trained_model_dir = self.state.settings.model_train_dir(model_id)
-            if trained_model_dir.is_dir():
-                trained_models.append((model_id, None))
+        text = ""
+        if texts:
+            text = texts[0].strip()
 
-            suffixes = self.state.settings.get_suffixes(model_id)
-            for suffix in suffixes:
-                trained_model_dir = self.state.settings.model_train_dir(
-                    model_id, suffix
-                )
-                if trained_model_dir.is_dir():
-                    trained_models.append((model_id, suffix))
+        if not text:
+            # Use custom response if available
+            with self.stats.measure("response"):
+                if self.model_id not in self.state.unknown_sentence_responses:
+                    try:
+                        # Reload responses
+                        load_responses(self.state, self.model_id)
+                    except Exception:
+                        _LOGGER.exception("Unexpected error loading responses")
+
+                text = self.state.unknown_sentence_responses.get(self.model_id, "")
 
-        if not trained_models:
-            _LOGGER.warning("No trained models found.")
+        _LOGGER.debug("Final text: %s", text)
+        await self.write_event(Transcript(text=text).event())
 
-        # program -> language -> (model_id, suffix)
-        language_support: Dict[str, Dict[str, Tuple[str, Optional[str]]]] = defaultdict(
-            dict
+        self.stats.add("transcript", time.monotonic() - start_time)
+        _LOGGER.debug(
+            "Stage timings for client %s (audio=%0.2fs, rtf=%s): %s",
+            self.client_id,
+            self.stats.audio_seconds,
+            self.stats.real_time_factor,
+            dict(self.stats.stage_seconds),
         )
-        for model_id, suffix in trained_models:
-            # en_US-rhasspy -> rhasspy
-            language = model_id.split("-", maxsplit=1)[0]
-            if suffix:
-                program = f"rhasspy-{suffix}"
+        self.state.metrics.observe_utterance(
+            self.stats,
+            decode_mode=self.state.settings.decode_mode.value,
+            streaming=self.is_streaming,
+        )
+
+        self.release_audio_processors()
+        self.is_utterance_finished = True
+
+    def process_vad(self, audio: bytes) -> bool:
+        """Run VAD on audio to detect start or end of speech.
+
+        Returns True if the end of speech has been detected.
+        """
+        assert self.vad is not None
+
+        self.vad_buffer.write(audio)
+        while len(self.vad_buffer) >= self.vad_bytes_per_chunk:
+            vad_chunk = self.vad_buffer.peek(self.vad_bytes_per_chunk)
+            with self.stats.measure("vad"):
+                speech_prob = self.vad.process_chunk(vad_chunk)
+
+            self.vad_buffer.skip(self.vad_bytes_per_chunk)
+
+            if self.trimmer is not None:
+                self.trimmer.process(speech_prob, self.vad_seconds_per_chunk)
+
+            if not self.is_speech_started:
+                if speech_prob <= self.vad_threshold:
+                    continue
+
+                self.is_speech_started = True
+                self.stats.add("vad_wait", time.monotonic() - self.stats.start_time)
+
+                # Buffered audio will be cleaned when next chunk arrives
+                self.buffer_offset_seconds = self.stats.audio_seconds
+                if self.before_speech_buffer is not None:
+                    before_speech_audio = self.before_speech_buffer.getvalue()
+                    self.speex_audio_buffer.write(before_speech_audio)
+                    self.buffer_offset_seconds -= (
+                        len(before_speech_audio) / BYTES_PER_SECOND
+                    )
+
+                if not self.needs_vad_after_speech:
+                    # VAD is no longer needed
+                    break
+
+            if (self.pause_detector is not None) and (not self.is_coqui):
+                # Coqui STT models aren't decoded speculatively
+                self.process_pause(speech_prob)
+
+            if (self.endpointer is not None) and self.endpointer.process(
+                speech_prob, self.vad_seconds_per_chunk
+            ):
+                return True
+
+        return False
+
+    @property
+    def needs_vad_after_speech(self) -> bool:
+        """True if VAD is still used after the start of speech."""
+        return (
+            (self.endpointer is not None)
+            or (self.pause_detector is not None)
+            or (self.trimmer is not None)
+        )
+
+    def trim_silence(self, audio: Union[bytes, memoryview]) -> Union[bytes, memoryview]:
+        """Cut non-speech audio before and after speech from buffered audio."""
+        if (self.trimmer is None) or (not self.is_speech_started):
+            return audio
+
+        start_seconds, end_seconds = self.trimmer.get_bounds(
+            self.buffer_offset_seconds, len(audio) / BYTES_PER_SECOND
+        )
+        bytes_per_sample = WIDTH * CHANNELS
+        start_idx = int(start_seconds * RATE) * bytes_per_sample
+        end_idx = int(end_seconds * RATE) * bytes_per_sample
+        trimmed_audio = audio[start_idx:end_idx]
+
+        self.stats.trimmed_seconds = (
+            len(audio) - len(trimmed_audio)
+        ) / BYTES_PER_SECOND
+
+        return trimmed_audio
+
+    def process_pause(self, speech_prob: float) -> None:
+        """Start a speculative decode when speech pauses and cancel it on speech.
+
+        Like partial transcripts, speculative decodes aren't started while other
+        decodes are waiting for the scheduler.
+        """
+        assert self.pause_detector is not None
+
+        was_paused = self.pause_detector.is_paused
+        if self.pause_detector.process(speech_prob, self.vad_seconds_per_chunk):
+            _LOGGER.debug("Pause detected for client %s", self.client_id)
+            self.cancel_speculative_task()
+            if not self.state.decode_scheduler.has_free_slot:
+                self.state.metrics.speculative_decodes.inc(result="skipped")
+                return
+
+            self.speculative_task = asyncio.create_task(
+                self.decode(audio=bytes(self.audio_buffer.peek()), stage="speculative")
+            )
+        elif was_paused and (not self.pause_detector.is_paused):
+            # More speech arrived, so the result would be incomplete
+            if self.speculative_task is not None:
+                _LOGGER.debug("Speech resumed for client %s", self.client_id)
+                self.state.metrics.speculative_decodes.inc(result="cancelled")
+
+            self.cancel_speculative_task()
+
+    async def decode_buffered(self) -> List[str]:
+        """Decode buffered audio, using the speculative decode if possible."""
+        if self.speculative_task is not None:
+            try:
+                texts = await self.speculative_task
+                _LOGGER.debug("Using speculative decode for client %s", self.client_id)
+                self.state.metrics.speculative_decodes.inc(result="used")
+                return texts
+            except Exception:
+                _LOGGER.debug("Speculative decode failed", exc_info=True)
+                self.state.metrics.speculative_decodes.inc(result="failed")
+
+        return await self.decode()
+
+    async def decode(
+        self,
+        audio_stream: Optional[AsyncIterable[bytes]] = None,
+        audio: Optional[Union[bytes, memoryview]] = None,
+        stage: str = "decode",
+    ) -> List[str]:
+        """Decode audio when the scheduler allows it.
+
+        Uses the buffered audio if neither audio_stream or audio are given.
+        Time spent decoding is added to stage.
+        """
+        settings = self.state.settings
+        audio_seconds = 0.0
+        if audio_stream is None:
+            if audio is None:
+                audio = self.audio_buffer.peek()
+
+            audio = self.trim_silence(audio)
+            audio_seconds = len(audio) / BYTES_PER_SECOND
+
+        async with self.state.decode_scheduler.slot(
+            audio_seconds=audio_seconds, timeout=settings.decode_timeout
+        ) as slot:
+            self.stats.add("queue", slot.queued_seconds)
+            if slot.degraded:
+                _LOGGER.debug("Degraded decode for client %s", self.client_id)
+
+            transcriber = self.get_transcriber(slot.degraded)
+            if audio_stream is not None:
+                assert isinstance(transcriber, KaldiNnet3StreamTranscriber)
+                texts = await self.transcribe_stream(transcriber, audio_stream)
             else:
-                program = "rhasspy"
-
-            language_support[program][language] = (model_id, suffix)
-
-        info = Info(
-            asr=[
-                AsrProgram(
-                    name=program,
-                    description="A fixed input speech-to-text system based on Kaldi",
-                    attribution=Attribution(
-                        name="synesthesiam",
-                        url="https://github.com/synesthesiam/rhasspy-speech",
-                    ),
-                    installed=True,
-                    version="1.0.0",
-                    models=[
-                        AsrModel(
-                            name=(
-                                model_id if (suffix is None) else f"{model_id}/{suffix}"
-                            ),
-                            description=model_id,
-                            attribution=Attribution(name="", url=""),
-                            installed=True,
-                            version=None,
-                            languages=[language],
-                        )
-                        for language, (model_id, suffix) in languages.items()
-                    ],
+                timeout: Optional[float] = None
+                if settings.decode_timeout is not None:
+                    timeout = max(0, settings.decode_timeout - slot.queued_seconds)
+
+                assert audio is not None
+                with self.stats.measure(stage):
+                    texts = await asyncio.wait_for(
+                        self.transcribe_audio(transcriber, audio), timeout=timeout
+                    )
+
+        return texts
+
+    def get_transcriber(self, degraded: bool) -> KaldiTranscriber:
+        """Create a transcriber for the selected model."""
+        return create_transcriber(
+            self.state.settings,
+            self.decoder_key(degraded=degraded),
+            self.state.kaldi_tools,
+        )
+
+    def start_partial_task(self) -> None:
+        """Start a partial decode if enough new audio has arrived.
+
+        Only one partial decode runs at a time, and none are started while other
+        decodes are waiting for the scheduler.
+        """
+        assert self.partial_interval is not None
+
+        if (self.partial_task is not None) and (not self.partial_task.done()):
+            return
+
+        audio_seconds = len(self.audio_buffer) / BYTES_PER_SECOND
+        if (audio_seconds - self.partial_audio_seconds) < self.partial_interval:
+            return
+
+        if not self.state.decode_scheduler.has_free_slot:
+            return
+
+        self.partial_audio_seconds = audio_seconds
+        self.partial_task = asyncio.create_task(
+            self.send_partial(bytes(self.audio_buffer.peek()))
+        )
+
+    async def send_partial(self, audio: bytes) -> None:
+        """Decode audio received so far and send a partial transcript."""
+        assert self.model_train_dir is not None
+
+        settings = self.state.settings
+        if settings.decode_mode == LangSuffix.GRAMMAR:
+            lang_dir = self.model_train_dir / "data" / "lang_grammar"
+        else:
+            # Skip rescoring for partial transcripts
+            lang_dir = self.model_train_dir / "data" / "lang_arpa"
+
+        try:
+            async with self.state.decode_scheduler.slot(
+                audio_seconds=len(audio) / BYTES_PER_SECOND
+            ) as slot:
+                transcriber = self.get_transcriber(slot.degraded)
+                assert isinstance(transcriber, KaldiNnet3StreamTranscriber)
+                texts = await transcriber.async_transcribe(
+                    pcm_stream(audio),
+                    lang_dir=lang_dir,
+                    nbest=1,
+                    max_fuzzy_cost=settings.max_fuzzy_cost,
+                    require_fuzzy=False,
+                )
+        except DecodeRejectedError:
+            return
+        except Exception:
+            _LOGGER.exception("Unexpected error getting partial transcript")
+            return
+
+        text = texts[0].strip() if texts else ""
+        if (not text) or (text == self.partial_text):
+            return
+
+        self.partial_text = text
+        _LOGGER.debug("Partial text: %s", text)
+        await self.write_event(PartialTranscript(text=text).event())
+
+    async def transcribe_audio(
+        self, transcriber: KaldiTranscriber, audio: Union[bytes, memoryview]
+    ) -> List[str]:
+        """Transcribe 16-bit PCM audio."""
+        assert self.model_train_dir is not None
+
+        if isinstance(transcriber, KaldiNnet3StreamTranscriber):
+            # Pipe audio directly to the decoder
+            return await self.transcribe_stream(transcriber, pcm_stream(audio))
+
+        with tempfile.NamedTemporaryFile("wb+", suffix=".wav") as temp_file:
+            wav_path = temp_file.name
+            wav_writer: wave.Wave_write = wave.open(wav_path, "wb")
+            with wav_writer:
+                wav_writer.setframerate(16000)
+                wav_writer.setsampwidth(2)
+                wav_writer.setnchannels(1)
+                wav_writer.writeframes(audio)
+
+            if self.state.settings.decode_mode == LangSuffix.ARPA_RESCORE:
+                return await transcriber.async_transcribe_rescore(
+                    wav_path,
+                    old_lang_dir=self.model_train_dir / "data" / "lang_arpa",
+                    new_lang_dir=self.model_train_dir / "data" / "lang_arpa_rescore",
+                    nbest=self.state.settings.nbest,
+                    max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
+                    require_fuzzy=True,
+                )
+
+            return await transcriber.async_transcribe(
+                wav_path,
+                self.model_train_dir
+                / "data"
+                / f"lang_{self.state.settings.decode_mode.value}",
+                nbest=self.state.settings.nbest,
+                max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
+                require_fuzzy=True,
+            )
+
+    async def transcribe_stream(
+        self,
+        transcriber: KaldiNnet3StreamTranscriber,
+        audio_stream: AsyncIterable[bytes],
+    ) -> List[str]:
+        assert self.model_train_dir is not None
+
+        if self.state.settings.decode_mode == LangSuffix.ARPA_RESCORE:
+            # With rescoring
+            return await transcriber.async_transcribe_rescore(
+                audio_stream,
+                old_lang_dir=self.model_train_dir / "data" / "lang_arpa",
+                new_lang_dir=self.model_train_dir / "data" / "lang_arpa_rescore",
+                nbest=self.state.settings.nbest,
+                max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
+                require_fuzzy=True,
+            )
+
+        # Without rescoring
+        return await transcriber.async_transcribe(
+            audio_stream,
+            lang_dir=self.model_train_dir
+            / "data"
+            / f"lang_{self.state.settings.decode_mode.value}",
+            nbest=self.state.settings.nbest,
+            max_fuzzy_cost=self.state.settings.max_fuzzy_cost,
+            require_fuzzy=True,
+        )
+
+    def decoder_key(self, degraded: bool = False) -> DecoderKey:
+        assert self.model_id
+        return DecoderKey(
+            self.model_id,
+            self.model_suffix,
+            self.state.settings.decode_mode,
+            degraded=degraded,
+        )
+
+    async def finish_coqui(self) -> List[str]:
+        """End the Coqui STT stream and return the worker to the pool."""
+        assert self.coqui_transcriber is not None
+        assert self.model_train_dir is not None
+
+        transcriber = self.coqui_transcriber
+        self.coqui_transcriber = None
+        try:
+            probs = await transcriber.finish_stream()
+            text = await transcriber.decode_probs(probs, self.model_train_dir)
+        except BaseException:
+            # Worker may be in the middle of a stream
+            self.state.coqui_pool.discard(transcriber)
+            raise
+
+        self.state.coqui_pool.release(transcriber)
+        return [text]
+
+    def discard_coqui_transcriber(self) -> None:
+        """Stop a Coqui STT worker whose stream was not finished."""
+        if self.coqui_transcriber is not None:
+            self.state.coqui_pool.discard(self.coqui_transcriber)
+            self.coqui_transcriber = None
+
+    async def buffer_audio(self, audio: bytes) -> bool:
+        """Add audio to audio_buffer. Returns False if the utterance was ended."""
+        settings = self.state.settings
+        metrics = self.state.metrics
+        max_bytes = self.audio_buffer.max_bytes
+        if (max_bytes is not None) and (
+            (len(self.audio_buffer) + len(audio)) > max_bytes
+        ):
+            metrics.audio_buffer_overflows.inc(
+                policy=settings.audio_buffer_policy.value
+            )
+            if settings.audio_buffer_policy == OverflowPolicy.ABORT:
+                _LOGGER.warning(
+                    "Audio buffer for client %s is full, ending utterance",
+                    self.client_id,
+                )
+                await self.finish_utterance()
+                return False
+
+        num_dropped = self.audio_buffer.write(audio)
+        if num_dropped > 0:
+            # Buffer now starts later in the utterance
+            self.buffer_offset_seconds += num_dropped / BYTES_PER_SECOND
+            metrics.audio_buffer_dropped_bytes.inc(num_dropped)
+
+        return True
+
+    def create_audio_queue(self) -> AudioQueue:
+        settings = self.state.settings
+        max_bytes: Optional[int] = None
+        if settings.audio_queue_seconds is not None:
+            max_bytes = int(settings.audio_queue_seconds * BYTES_PER_SECOND)
+
+        # Partial frames are flushed after one frame's duration
+        frame_bytes: Optional[int] = None
+        if settings.stream_frame_seconds is not None:
+            frame_bytes = int(settings.stream_frame_seconds * RATE) * WIDTH * CHANNELS
+
+        return AudioQueue(
+            max_bytes=max_bytes,
+            policy=settings.audio_queue_policy,
+            frame_bytes=frame_bytes,
+            flush_seconds=settings.stream_frame_seconds,
+        )
+
+    def observe_audio_queue(self) -> None:
+        """Record statistics for the streaming audio queue of an utterance."""
+        metrics = self.state.metrics
+        audio_queue = self.audio_queue
+        metrics.audio_queue_high_water_bytes.observe(audio_queue.high_water_bytes)
+        self.stats.add("audio_queue_blocked", audio_queue.blocked_seconds)
+
+        if audio_queue.num_overflows > 0:
+            _LOGGER.debug(
+                "Audio queue for client %s overflowed %s time(s), dropped %s byte(s)",
+                self.client_id,
+                audio_queue.num_overflows,
+                audio_queue.num_dropped_bytes,
+            )
+            metrics.audio_queue_overflows.inc(
+                audio_queue.num_overflows, policy=audio_queue.policy.value
+            )
+
+        if audio_queue.num_dropped_bytes > 0:
+            metrics.audio_queue_dropped_bytes.inc(audio_queue.num_dropped_bytes)
+
+    def cancel_transcribe_task(self) -> None:
+        """Cancel a streaming decode that is still running."""
+        if self.transcribe_task is not None:
+            self.transcribe_task.cancel()
+            self.transcribe_task = None
+
+    def cancel_partial_task(self) -> None:
+        """Cancel a partial decode so it can't be sent after the transcript."""
+        if self.partial_task is not None:
+            self.partial_task.cancel()
+            self.partial_task = None
+
+    def cancel_speculative_task(self) -> None:
+        """Cancel a speculative decode whose audio is out of date."""
+        if self.speculative_task is not None:
+            self.speculative_task.cancel()
+            self.speculative_task = None
+
+    def acquire_audio_processors(self) -> None:
+        """Check out VAD/Speex sessions from the shared pools.
+
+        Sessions still checked out from a previous utterance are reset instead.
+        """
+        settings = self.state.settings
+        if settings.vad_enabled:
+            if self.vad is None:
+                self.vad = self.state.vad_pool.acquire(VAD_KEY)
+                self.vad_bytes_per_chunk = self.vad.chunk_bytes()
+                self.vad_seconds_per_chunk = self.vad_bytes_per_chunk / (
+                    RATE * WIDTH * CHANNELS
                 )
-                for program, languages in language_support.items()
-            ],
+            else:
+                self.vad.reset()
+
+        if settings.speex_enabled:
+            if self.speex is None:
+                self.speex = self.state.speex_pool.acquire(settings.speex_key)
+            else:
+                self.speex.reset()
+
+    def release_audio_processors(self) -> None:
+        """Return VAD/Speex sessions to the shared pools."""
+        if self.vad is not None:
+            self.state.vad_pool.release(self.vad)
+            self.vad = None
+
+        if self.speex is not None:
+            self.state.speex_pool.release(self.speex)
+            self.speex = None
+
+    async def disconnect(self) -> None:
+        self.cancel_transcribe_task()
+        self.cancel_partial_task()
+        self.cancel_speculative_task()
+        self.discard_coqui_transcriber()
+        self.release_audio_processors()
+        self.state.metrics.buffer_high_water_bytes.observe(self.buffer_high_water_mark)
+        _LOGGER.debug(
+            "Audio buffer high-water mark for client %s: %s byte(s)",
+            self.client_id,
+            self.buffer_high_water_mark,
         )
-        _LOGGER.debug(info)
 
-        return info
+    @property
+    def buffer_high_water_mark(self) -> int:
+        """Largest number of bytes held in one audio buffer by this connection."""
+        return max(
+            self.audio_buffer.high_water_mark,
+            self.vad_buffer.high_water_mark,
+            self.speex_audio_buffer.high_water_mark,
+        )
+
+    def get_info(self) -> Info:
+        return self.state.model_catalog.info
+
 
+async def queue_stream(audio_queue: AudioQueue) -> AsyncIterator[bytes]:
+    """Yield audio chunks from a queue until it is closed."""
+    while True:
+        chunk = await audio_queue.get()
+        if chunk is None:
+            break
 
-def multiply_volume(chunk: bytes, volume_multiplier: float) -> bytes:
-    """Multiplies 16-bit PCM samples by a constant."""
+        yield chunk
 
-    def _clamp(val: float) -> float:
-        """Clamp to signed 16-bit."""
-        return max(-32768, min(32767, val))
 
-    return array.array(
-        "h",
-        (int(_clamp(value * volume_multiplier)) for value in array.array("h", chunk)),
-    ).tobytes()
+async def pcm_stream(
+    audio: Union[bytes, memoryview], bytes_per_chunk: int = RATE * WIDTH * CHANNELS
+) -> AsyncIterator[bytes]:
+    """Yield buffered 16-bit PCM audio in chunks."""
+    for audio_idx in range(0, len(audio), bytes_per_chunk):
+        yield bytes(audio[audio_idx : audio_idx + bytes_per_chunk])
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,322 @@
+"""Audio processing helpers for 16-bit mono PCM."""
+
+import math
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+from pyspeex_noise import AudioProcessor as SpeexAudioProcessor
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+def multiply_volume(chunk: bytes, volume_multiplier: float) -> Tuple[bytes, int]:
+    """Multiplies 16-bit PCM samples by a constant.
+
+    Returns the scaled audio and the number of samples that were clipped.
+    """
+    samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+    samples *= volume_multiplier
+
+    num_clipped = int(np.count_nonzero((samples > INT16_MAX) | (samples < INT16_MIN)))
+    np.clip(samples, INT16_MIN, INT16_MAX, out=samples)
+
+    return samples.astype(np.int16).tobytes(), num_clipped
+
+
+class AudioBuffer:
+    """Growable byte buffer with read/write cursors.
+
+    Writes copy into a preallocated bytearray, which is compacted or grown as
+    needed. Views returned by peek are only valid until the next write.
+
+    If max_bytes is set, the oldest unread bytes are dropped to stay under it.
+    """
+
+    def __init__(
+        self, capacity: int = 16000 * 2, max_bytes: Optional[int] = None
+    ) -> None:
+        self._buffer = bytearray(max(1, capacity))
+        self._read_idx = 0
+        self._write_idx = 0
+        self.max_bytes = max_bytes
+
+        self.high_water_mark = 0
+        """Largest number of unread bytes held at once."""
+
+    def __len__(self) -> int:
+        return self._write_idx - self._read_idx
+
+    def __bool__(self) -> bool:
+        return self._write_idx > self._read_idx
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    def write(self, data: bytes) -> int:
+        """Append data to the end of the buffer.
+
+        Returns the number of bytes dropped to stay under max_bytes.
+        """
+        num_bytes = len(data)
+        if num_bytes == 0:
+            return 0
+
+        num_dropped = 0
+        if (self.max_bytes is not None) and ((len(self) + num_bytes) > self.max_bytes):
+            num_dropped = len(self) + num_bytes - self.max_bytes
+            if num_dropped > len(self):
+                # Only the end of data fits
+                data = memoryview(data)[num_dropped - len(self) :]
+                num_bytes = len(data)
+
+            self.skip(num_dropped)
+
+        num_unread = len(self)
+        if (self._write_idx + num_bytes) > len(self._buffer):
+            if (num_unread + num_bytes) <= len(self._buffer):
+                # Move unread bytes to the front
+                self._buffer[:num_unread] = self._buffer[
+                    self._read_idx : self._write_idx
+                ]
+            else:
+                # Grow geometrically so appends are amortized O(1).
+                # A new bytearray is allocated so existing views stay valid.
+                new_capacity = len(self._buffer)
+                while new_capacity < (num_unread + num_bytes):
+                    new_capacity *= 2
+
+                new_buffer = bytearray(new_capacity)
+                new_buffer[:num_unread] = memoryview(self._buffer)[
+                    self._read_idx : self._write_idx
+                ]
+                self._buffer = new_buffer
+
+            self._read_idx = 0
+            self._write_idx = num_unread
+
+        memoryview(self._buffer)[self._write_idx : self._write_idx + num_bytes] = data
+        self._write_idx += num_bytes
+        self.high_water_mark = max(self.high_water_mark, len(self))
+
+        return num_dropped
+
+    def peek(self, num_bytes: Optional[int] = None) -> memoryview:
+        """View of up to num_bytes unread bytes without consuming them."""
+        if num_bytes is None:
+            end_idx = self._write_idx
+        else:
+            end_idx = min(self._write_idx, self._read_idx + num_bytes)
+
+        return memoryview(self._buffer)[self._read_idx : end_idx]
+
+    def skip(self, num_bytes: int) -> None:
+        """Consume num_bytes unread bytes."""
+        self._read_idx = min(self._write_idx, self._read_idx + num_bytes)
+        if self._read_idx == self._write_idx:
+            # Empty, so start from the front again
+            self._read_idx = 0
+            self._write_idx = 0
+
+    def read(self, num_bytes: Optional[int] = None) -> bytes:
+        """Copy and consume up to num_bytes unread bytes."""
+        data = bytes(self.peek(num_bytes))
+        self.skip(len(data))
+        return data
+
+    def getvalue(self) -> bytes:
+        """Copy of all unread bytes."""
+        return bytes(self.peek())
+
+    def clear(self) -> None:
+        """Discard all unread bytes, keeping the allocated capacity."""
+        self._read_idx = 0
+        self._write_idx = 0
+
+
+class SpeexSession:
+    """Speex processor that can be reset between connections.
+
+    Noise suppression and auto gain adapt to the audio they have seen, and
+    pyspeex-noise has no reset, so a new processor is created instead.
+    """
+
+    def __init__(self, auto_gain: int, noise_suppression: int) -> None:
+        self.auto_gain = auto_gain
+        self.noise_suppression = noise_suppression
+        self._processor = SpeexAudioProcessor(auto_gain, noise_suppression)
+
+    def process_10ms(self, frame: Union[bytes, memoryview]) -> bytes:
+        """Clean exactly 10ms of audio."""
+        # pyspeex-noise only accepts bytes
+        return self._processor.Process10ms(bytes(frame)).audio
+
+    def reset(self) -> None:
+        self._processor = SpeexAudioProcessor(self.auto_gain, self.noise_suppression)
+
+
+def process_frames(
+    process_frame: Callable[[memoryview], bytes],
+    input_buffer: AudioBuffer,
+    output_buffer: AudioBuffer,
+    frame_bytes: int,
+) -> int:
+    """Process all complete frames in input_buffer into output_buffer.
+
+    Frames are views into input_buffer, so they aren't copied unless
+    process_frame needs bytes. Incomplete frames stay in input_buffer for the
+    next call. Returns the number of frames processed.
+    """
+    num_frames = len(input_buffer) // frame_bytes
+    if num_frames < 1:
+        return 0
+
+    num_bytes = num_frames * frame_bytes
+    with input_buffer.peek(num_bytes) as frames:
+        for frame_idx in range(0, num_bytes, frame_bytes):
+            output_buffer.write(
+                process_frame(frames[frame_idx : frame_idx + frame_bytes])
+            )
+
+    input_buffer.skip(num_bytes)
+
+    return num_frames
+
+
+def pcm_to_float(audio: bytes, width: int) -> np.ndarray:
+    """Convert little-endian PCM to float32 samples on the 16-bit scale.
+
+    8-bit samples are signed, like audioop and Wyoming's AudioChunkConverter.
+    """
+    if width == 2:
+        return np.frombuffer(audio, dtype="<i2").astype(np.float32)
+
+    if width == 1:
+        return np.frombuffer(audio, dtype=np.int8).astype(np.float32) * 256
+
+    if width == 3:
+        raw = np.frombuffer(audio, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = np.where(samples >= (1 << 23), samples - (1 << 24), samples)
+        return samples.astype(np.float32) / 256
+
+    if width == 4:
+        return np.frombuffer(audio, dtype="<i4").astype(np.float32) / 65536
+
+    raise ValueError(f"Unsupported sample width: {width}")
+
+
+class PolyphaseResampler:
+    """Streaming rational resampler with a windowed-sinc polyphase filter.
+
+    Input history and the output position are kept between calls, so chunks can
+    be resampled one at a time without discontinuities at their boundaries.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, half_width: int = 8) -> None:
+        divisor = math.gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+
+        # Filter spans half_width samples on each side at the lower rate
+        taps_per_phase = math.ceil(2 * half_width * max(self.up, self.down) / self.up)
+        self.taps_per_phase = taps_per_phase
+
+        # Low-pass filter at the upsampled rate, just below the lower Nyquist
+        num_taps = self.up * taps_per_phase
+        cutoff = 0.45 / max(self.up, self.down)
+        offsets = np.arange(num_taps) - ((num_taps - 1) / 2)
+        taps = 2 * cutoff * np.sinc(2 * cutoff * offsets) * np.kaiser(num_taps, 8.0)
+        taps *= self.up / taps.sum()
+
+        # phase -> taps for input samples [i, i - 1, ..., i - taps_per_phase + 1]
+        self._phase_taps = (
+            taps.reshape(taps_per_phase, self.up).T.astype(np.float32).copy()
+        )
+        self._tap_offsets = np.arange(taps_per_phase)
+
+        self._history = np.zeros(0, dtype=np.float32)
+        self._next_time = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear input history."""
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+
+        # Position of the next output sample at the upsampled rate
+        self._next_time = (self.taps_per_phase - 1) * self.up
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample float32 samples."""
+        buffer = np.concatenate((self._history, samples))
+        end_time = len(buffer) * self.up
+        num_outputs = max(0, -(-(end_time - self._next_time) // self.down))
+
+        times = self._next_time + (np.arange(num_outputs) * self.down)
+        input_idxs = times // self.up
+        phases = times % self.up
+        windows = buffer[input_idxs[:, None] - self._tap_offsets[None, :]]
+        output = np.einsum("ij,ij->i", windows, self._phase_taps[phases])
+
+        # Keep enough input for the next output's filter
+        self._next_time += num_outputs * self.down
+        num_dropped = max(0, (self._next_time // self.up) - (self.taps_per_phase - 1))
+        self._history = buffer[num_dropped:]
+        self._next_time -= num_dropped * self.up
+
+        return output.astype(np.float32)
+
+
+class PcmConverter:
+    """Converts audio to 16-bit mono PCM at a fixed rate.
+
+    Audio that is already in the right format is passed through untouched.
+    Otherwise, samples are converted to 16-bit, channels are averaged, and the
+    rate is changed with a polyphase resampler whose state is kept between
+    chunks of the same stream.
+
+    A chunk that ends in the middle of a sample frame has its incomplete frame
+    carried over to the next chunk.
+    """
+
+    def __init__(self, rate: int) -> None:
+        self.rate = rate
+        self._resampler: Optional[PolyphaseResampler] = None
+        self._remainder = b""
+
+    def reset(self) -> None:
+        """Start a new stream."""
+        self._remainder = b""
+        if self._resampler is not None:
+            self._resampler.reset()
+
+    def convert(self, audio: bytes, rate: int, width: int, channels: int) -> bytes:
+        frame_bytes = width * channels
+        if self._remainder or (len(audio) % frame_bytes):
+            audio = self._remainder + audio
+            num_complete_bytes = len(audio) - (len(audio) % frame_bytes)
+            self._remainder = audio[num_complete_bytes:]
+            audio = audio[:num_complete_bytes]
+
+        if (rate == self.rate) and (width == 2) and (channels == 1):
+            # Fast path
+            return audio
+
+        samples = pcm_to_float(audio, width)
+        if channels > 1:
+            # Downmix
+            num_frames = len(samples) // channels
+            samples = samples[: num_frames * channels].reshape(num_frames, channels)
+            samples = samples.mean(axis=1)
+
+        if rate != self.rate:
+            if (self._resampler is None) or (self._resampler.in_rate != rate):
+                self._resampler = PolyphaseResampler(rate, self.rate)
+
+            samples = self._resampler.process(samples)
+
+        np.clip(samples, INT16_MIN, INT16_MAX, out=samples)
+        return samples.astype(np.int16).tobytes()
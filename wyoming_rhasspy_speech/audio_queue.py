@@ -0,0 +1,203 @@
+"""Byte-bounded queue for streaming audio."""
+
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Optional
+
+
+class OverflowPolicy(str, Enum):
+    BLOCK = "block"
+    """Wait for the reader before accepting more audio."""
+
+    DROP_OLDEST = "drop_oldest"
+    """Drop queued audio to make room."""
+
+    ABORT = "abort"
+    """Abort the utterance."""
+
+
+class AudioQueueOverflowError(Exception):
+    """Audio queue was full with the abort policy."""
+
+
+class AudioQueue:
+    """Queue of audio chunks for a single writer and a single reader.
+
+    Holds at most max_bytes of audio, unless a single chunk is larger. What
+    happens when the queue is full depends on the overflow policy.
+
+    If frame_bytes is set, the reader gets audio in frames of that size instead
+    of the chunks that were put. A shorter frame is returned once its oldest
+    audio has waited flush_seconds, or when the queue is closed.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        frame_bytes: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.frame_bytes = frame_bytes
+        self.flush_seconds = flush_seconds
+
+        self._chunks: Deque[bytes] = deque()
+        self._chunk_times: Deque[float] = deque()
+        self._num_bytes = 0
+        self._is_closed = False
+        self._is_aborted = False
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+
+        self.high_water_bytes = 0
+        self.num_overflows = 0
+        self.num_dropped_bytes = 0
+        self.blocked_seconds = 0.0
+
+    @property
+    def num_bytes(self) -> int:
+        return self._num_bytes
+
+    async def put(self, chunk: bytes) -> None:
+        """Add a chunk of audio to the queue.
+
+        Raises AudioQueueOverflowError if the queue is full with the abort policy.
+        Chunks are ignored after the queue is closed.
+        """
+        if self._is_aborted:
+            raise AudioQueueOverflowError("Audio queue was aborted")
+
+        if self._is_closed:
+            return
+
+        if self._is_full(len(chunk)):
+            self.num_overflows += 1
+
+            if self.policy == OverflowPolicy.ABORT:
+                self._is_aborted = True
+                self._clear()
+                self._not_empty.set()
+                raise AudioQueueOverflowError(
+                    f"Audio queue is full ({self._num_bytes} byte(s))"
+                )
+
+            if self.policy == OverflowPolicy.DROP_OLDEST:
+                while self._is_full(len(chunk)):
+                    dropped_chunk = self._chunks.popleft()
+                    self._chunk_times.popleft()
+                    self._num_bytes -= len(dropped_chunk)
+                    self.num_dropped_bytes += len(dropped_chunk)
+            else:
+                start_time = time.monotonic()
+                while self._is_full(len(chunk)) and (not self._is_closed):
+                    self._not_full.clear()
+                    await self._not_full.wait()
+
+                self.blocked_seconds += time.monotonic() - start_time
+                if self._is_closed:
+                    return
+
+        self._chunks.append(chunk)
+        self._chunk_times.append(time.monotonic())
+        self._num_bytes += len(chunk)
+        self.high_water_bytes = max(self.high_water_bytes, self._num_bytes)
+
+        if (
+            (self.frame_bytes is None)
+            or (len(self._chunks) == 1)
+            or (self._num_bytes >= self.frame_bytes)
+        ):
+            # Only wake the reader for a full frame or to start its flush timer
+            self._not_empty.set()
+
+    async def get(self) -> Optional[bytes]:
+        """Get the next chunk of audio, or None if the queue is closed and empty.
+
+        Raises AudioQueueOverflowError if the queue was aborted.
+        """
+        if self.frame_bytes is not None:
+            return await self._get_frame(self.frame_bytes)
+
+        while (not self._chunks) and (not self._is_closed) and (not self._is_aborted):
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        if self._is_aborted:
+            raise AudioQueueOverflowError("Audio queue was aborted")
+
+        if not self._chunks:
+            return None
+
+        chunk = self._chunks.popleft()
+        self._chunk_times.popleft()
+        self._num_bytes -= len(chunk)
+        self._not_full.set()
+
+        return chunk
+
+    def close(self) -> None:
+        """Signal the end of audio. Unblocks both the writer and the reader."""
+        self._is_closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+    async def _get_frame(self, frame_bytes: int) -> Optional[bytes]:
+        """Wait for a full frame, the flush timeout, or the queue to close."""
+        while (
+            (self._num_bytes < frame_bytes)
+            and (not self._is_closed)
+            and (not self._is_aborted)
+        ):
+            self._not_empty.clear()
+            if (not self._chunks) or (self.flush_seconds is None):
+                await self._not_empty.wait()
+                continue
+
+            wait_seconds = self._chunk_times[0] + self.flush_seconds - time.monotonic()
+            if wait_seconds <= 0:
+                break
+
+            try:
+                await asyncio.wait_for(self._not_empty.wait(), timeout=wait_seconds)
+            except asyncio.TimeoutError:
+                break
+
+        if self._is_aborted:
+            raise AudioQueueOverflowError("Audio queue was aborted")
+
+        if not self._chunks:
+            return None
+
+        frame = bytearray()
+        while self._chunks and (len(frame) < frame_bytes):
+            chunk = self._chunks[0]
+            num_needed = frame_bytes - len(frame)
+            if len(chunk) <= num_needed:
+                frame.extend(chunk)
+                self._chunks.popleft()
+                self._chunk_times.popleft()
+            else:
+                # Rest of the chunk keeps its arrival time
+                frame.extend(chunk[:num_needed])
+                self._chunks[0] = chunk[num_needed:]
+
+        self._num_bytes -= len(frame)
+        self._not_full.set()
+
+        return bytes(frame)
+
+    def _is_full(self, num_bytes: int) -> bool:
+        return (
+            (self.max_bytes is not None)
+            and bool(self._chunks)
+            and ((self._num_bytes + num_bytes) > self.max_bytes)
+        )
+
+    def _clear(self) -> None:
+        self._chunks.clear()
+        self._chunk_times.clear()
+        self._num_bytes = 0
@@ -0,0 +1,130 @@
+"""Train several models at the same time in separate processes."""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Iterable, List, Optional, Tuple
+
+from .shared import AppSettings, AppState
+from .web_server import train_model
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class TrainJobResult:
+    """Outcome of training one model."""
+
+    model_id: str
+    suffix: Optional[str]
+
+    is_trained: bool = False
+    """False if the model was already up to date."""
+
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def model_name(self) -> str:
+        if self.suffix is None:
+            return self.model_id
+
+        return f"{self.model_id}/{self.suffix}"
+
+
+async def train_models(
+    state: AppState,
+    models: Iterable[Tuple[str, Optional[str]]],
+    max_workers: Optional[int] = None,
+    force: bool = False,
+) -> List[TrainJobResult]:
+    """Train (model_id, suffix) pairs in a process pool.
+
+    Each job runs in a fresh process, so a failing or crashing job doesn't
+    affect the others. Errors are returned in the results instead of raised.
+    """
+    models = list(dict.fromkeys(models))
+    if not models:
+        return []
+
+    num_workers = min(len(models), max_workers or os.cpu_count() or 1)
+    _LOGGER.info("Training %s model(s) with %s worker(s)", len(models), num_workers)
+
+    loop = asyncio.get_running_loop()
+
+    # Forked workers would inherit the running event loop and server threads
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(logging.getLogger().getEffectiveLevel(),),
+        max_tasks_per_child=1,
+    ) as executor:
+        maybe_results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    executor,
+                    partial(_train_job, state.settings, model_id, suffix, force),
+                )
+                for model_id, suffix in models
+            ),
+            return_exceptions=True,
+        )
+
+    results: List[TrainJobResult] = []
+    for (model_id, suffix), maybe_result in zip(models, maybe_results):
+        if isinstance(maybe_result, TrainJobResult):
+            result = maybe_result
+        else:
+            # Worker process died
+            result = TrainJobResult(
+                model_id=model_id, suffix=suffix, error=repr(maybe_result)
+            )
+
+        if result.error:
+            _LOGGER.error("Failed to train %s: %s", result.model_name, result.error)
+        elif result.is_trained:
+            # Transcribers in this process still use the old files
+            state.invalidate_model(model_id, suffix)
+            _LOGGER.info(
+                "Trained %s in %0.2f second(s)", result.model_name, result.seconds
+            )
+
+        results.append(result)
+
+    return results
+
+
+# -----------------------------------------------------------------------------
+
+
+def _init_worker(log_level: int) -> None:
+    logging.basicConfig(level=log_level)
+
+
+def _train_job(
+    settings: AppSettings, model_id: str, suffix: Optional[str], force: bool
+) -> TrainJobResult:
+    """Train a model in a worker process.
+
+    AppState holds transcriber pools that can't be pickled, so each worker
+    creates its own from the settings.
+    """
+    result = TrainJobResult(model_id=model_id, suffix=suffix)
+    start_time = time.monotonic()
+    try:
+        state = AppState(settings=settings)
+        result.is_trained = asyncio.run(
+            train_model(state, model_id, suffix, force=force)
+        )
+    except Exception as err:
+        result.error = str(err) or repr(err)
+    finally:
+        result.seconds = time.monotonic() - start_time
+
+    return result
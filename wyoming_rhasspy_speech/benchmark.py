@@ -0,0 +1,616 @@
+"""Load test a running server by replaying WAV files over Wyoming.
+
+Example:
+
+    python3 -m wyoming_rhasspy_speech.benchmark \\
+        --uri tcp://127.0.0.1:10300 --concurrency 4 --decode-mode arpa \\
+        --server-pid "$(pidof -s python3)" --output results.jsonl wavs/
+
+The server's decode mode and streaming setting can't be queried over Wyoming,
+so --decode-mode and --streaming only label the results and must match how the
+server was started. Runs saved with --output can be compared with --report.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import time
+import wave
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from wyoming.asr import Transcribe, Transcript
+from wyoming.audio import AudioChunk, AudioStart, AudioStop
+from wyoming.client import AsyncClient
+
+_LOGGER = logging.getLogger("benchmark")
+
+PERCENTILES = (50, 95, 99)
+DECODE_MODES = ("grammar", "arpa", "arpa_rescore")
+
+# cpu ticks, cpu ticks of exited children, rss bytes
+ProcessStat = Tuple[int, int, int]
+
+
+@dataclass
+class WavAudio:
+    """WAV file loaded into memory so disk reads aren't measured."""
+
+    path: Path
+    audio: bytes
+    rate: int
+    width: int
+    channels: int
+
+    @property
+    def seconds(self) -> float:
+        return len(self.audio) / (self.rate * self.width * self.channels)
+
+    @staticmethod
+    def load(wav_path: Path) -> "WavAudio":
+        wav_file: wave.Wave_read = wave.open(str(wav_path), "rb")
+        with wav_file:
+            return WavAudio(
+                path=wav_path,
+                audio=wav_file.readframes(wav_file.getnframes()),
+                rate=wav_file.getframerate(),
+                width=wav_file.getsampwidth(),
+                channels=wav_file.getnchannels(),
+            )
+
+
+@dataclass
+class RequestResult:
+    """Timings for a single transcription request."""
+
+    wav_path: str
+    audio_seconds: float
+    text: str = ""
+
+    time_to_transcript: float = 0.0
+    """Seconds from audio-stop until the transcript arrived."""
+
+    processing_seconds: float = 0.0
+    """Seconds from transcribe until the transcript, minus time spent pacing."""
+
+    error: Optional[str] = None
+
+    @property
+    def real_time_factor(self) -> Optional[float]:
+        if self.audio_seconds <= 0:
+            return None
+
+        return self.processing_seconds / self.audio_seconds
+
+
+# -----------------------------------------------------------------------------
+
+
+class ProcessMonitor:
+    """Samples CPU time and RSS of a process and its children from /proc.
+
+    Kaldi and Coqui STT decoders run as child processes of the server, so
+    they're included.
+
+    CPU time is the sum of each live process's own and reaped children's CPU
+    time. When a process exits and is reaped, its CPU time moves into its
+    parent's, so it is counted exactly once, even for short-lived decoders that
+    were never sampled.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.25) -> None:
+        self.pid = pid
+        self.interval = interval
+
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+        # CPU ticks of the process tree at start and at the last sample
+        self._start_ticks = 0
+        self._last_ticks = 0
+
+        self.rss_samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._start_ticks = self._total_ticks(self._read_stats())
+        self._last_ticks = self._start_ticks
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self.sample()
+
+    def sample(self) -> None:
+        stats = self._read_stats()
+        if stats:
+            self._last_ticks = self._total_ticks(stats)
+            self.rss_samples.append(sum(stat[2] for stat in stats.values()))
+
+    @property
+    def cpu_seconds(self) -> float:
+        return (self._last_ticks - self._start_ticks) / self._clock_ticks
+
+    @property
+    def peak_rss_bytes(self) -> int:
+        return max(self.rss_samples, default=0)
+
+    @property
+    def mean_rss_bytes(self) -> float:
+        if not self.rss_samples:
+            return 0.0
+
+        return sum(self.rss_samples) / len(self.rss_samples)
+
+    @staticmethod
+    def _total_ticks(stats: Dict[int, ProcessStat]) -> int:
+        return sum(ticks + child_ticks for ticks, child_ticks, _rss in stats.values())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sample()
+
+    def _read_stats(self) -> Dict[int, ProcessStat]:
+        """Read (cpu ticks, child cpu ticks, rss bytes) for the process tree."""
+        parents: Dict[int, int] = {}
+        stats: Dict[int, ProcessStat] = {}
+        for proc_dir in Path("/proc").iterdir():
+            if not proc_dir.name.isdigit():
+                continue
+
+            try:
+                stat_text = (proc_dir / "stat").read_text(encoding="utf-8")
+                statm_text = (proc_dir / "statm").read_text(encoding="utf-8")
+            except OSError:
+                # Process exited
+                continue
+
+            # Process name may contain spaces and parentheses
+            fields = stat_text[stat_text.rfind(")") + 2 :].split()
+            pid = int(proc_dir.name)
+            parents[pid] = int(fields[1])
+            stats[pid] = (
+                int(fields[11]) + int(fields[12]),
+                int(fields[13]) + int(fields[14]),
+                int(statm_text.split()[1]) * self._page_size,
+            )
+
+        tree_pids = {self.pid} if self.pid in stats else set()
+        added = True
+        while added:
+            added = False
+            for pid, parent_pid in parents.items():
+                if (parent_pid in tree_pids) and (pid not in tree_pids):
+                    tree_pids.add(pid)
+                    added = True
+
+        return {pid: stats[pid] for pid in tree_pids}
+
+
+# -----------------------------------------------------------------------------
+
+
+async def transcribe_wav(
+    uri: str,
+    wav: WavAudio,
+    samples_per_chunk: int = 1600,
+    speed: float = 1.0,
+    model_name: Optional[str] = None,
+    language: Optional[str] = None,
+) -> RequestResult:
+    """Send a WAV file to the server and wait for its transcript.
+
+    Chunks are sent at speed times real time, or as fast as possible if speed
+    is 0. Partial transcripts and other events are ignored.
+    """
+    result = RequestResult(wav_path=str(wav.path), audio_seconds=wav.seconds)
+    bytes_per_chunk = samples_per_chunk * wav.width * wav.channels
+    pacing_seconds = 0.0
+
+    async with AsyncClient.from_uri(uri) as client:
+        start_time = time.monotonic()
+        await client.write_event(Transcribe(name=model_name, language=language).event())
+        await client.write_event(
+            AudioStart(rate=wav.rate, width=wav.width, channels=wav.channels).event()
+        )
+
+        audio_seconds = 0.0
+        for audio_idx in range(0, len(wav.audio), bytes_per_chunk):
+            chunk = AudioChunk(
+                rate=wav.rate,
+                width=wav.width,
+                channels=wav.channels,
+                audio=wav.audio[audio_idx : audio_idx + bytes_per_chunk],
+            )
+            await client.write_event(chunk.event())
+
+            if speed > 0:
+                audio_seconds += chunk.seconds
+                delay = (start_time + (audio_seconds / speed)) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    pacing_seconds += delay
+
+        await client.write_event(AudioStop().event())
+        stop_time = time.monotonic()
+
+        while True:
+            event = await client.read_event()
+            if event is None:
+                result.error = "Server disconnected before transcript"
+                return result
+
+            if Transcript.is_type(event.type):
+                result.text = Transcript.from_event(event).text
+                break
+
+    end_time = time.monotonic()
+    result.time_to_transcript = end_time - stop_time
+    result.processing_seconds = (end_time - start_time) - pacing_seconds
+
+    return result
+
+
+async def run_benchmark(
+    uri: str,
+    wavs: Sequence[WavAudio],
+    num_requests: int,
+    concurrency: int = 1,
+    timeout: Optional[float] = None,
+    **transcribe_kwargs: Any,
+) -> List[RequestResult]:
+    """Send num_requests requests with up to concurrency at a time.
+
+    WAV files are reused in order if there are more requests than files.
+    """
+    wav_iter = itertools.islice(itertools.cycle(wavs), num_requests)
+    results: List[RequestResult] = []
+
+    async def worker() -> None:
+        # Iterator is shared between workers on the same event loop
+        for wav in wav_iter:
+            try:
+                result = await asyncio.wait_for(
+                    transcribe_wav(uri, wav, **transcribe_kwargs), timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                result = RequestResult(
+                    wav_path=str(wav.path),
+                    audio_seconds=wav.seconds,
+                    error="Timeout",
+                )
+            except OSError as err:
+                result = RequestResult(
+                    wav_path=str(wav.path), audio_seconds=wav.seconds, error=str(err)
+                )
+
+            if result.error:
+                _LOGGER.warning("%s: %s", result.wav_path, result.error)
+            else:
+                _LOGGER.debug(
+                    "%s: %s (%.3f second(s))",
+                    result.wav_path,
+                    result.text,
+                    result.time_to_transcript,
+                )
+
+            results.append(result)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return results
+
+
+# -----------------------------------------------------------------------------
+
+
+def percentile(values: Sequence[float], percent: float) -> Optional[float]:
+    """Percentile of values with linear interpolation between ranks."""
+    if not values:
+        return None
+
+    sorted_values = sorted(values)
+    rank = (len(sorted_values) - 1) * (percent / 100)
+    lower_idx = math.floor(rank)
+    upper_idx = math.ceil(rank)
+    fraction = rank - lower_idx
+
+    return sorted_values[lower_idx] + (
+        (sorted_values[upper_idx] - sorted_values[lower_idx]) * fraction
+    )
+
+
+@dataclass
+class BenchmarkSummary:
+    """Aggregate results of a benchmark run."""
+
+    decode_mode: str
+    streaming: bool
+    concurrency: int
+    num_requests: int
+    num_errors: int
+    wall_seconds: float
+    audio_seconds: float
+
+    time_to_transcript: Dict[str, Optional[float]] = field(default_factory=dict)
+    real_time_factor: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    cpu_seconds: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    mean_rss_bytes: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        streaming_str = "streaming" if self.streaming else "non-streaming"
+        return f"{self.decode_mode}/{streaming_str}"
+
+    @staticmethod
+    def from_results(
+        results: Iterable[RequestResult],
+        decode_mode: str,
+        streaming: bool,
+        concurrency: int,
+        wall_seconds: float,
+        monitor: Optional[ProcessMonitor] = None,
+    ) -> "BenchmarkSummary":
+        results = list(results)
+        ok_results = [result for result in results if not result.error]
+        latencies = [result.time_to_transcript for result in ok_results]
+        rtfs = [
+            rtf
+            for rtf in (result.real_time_factor for result in ok_results)
+            if rtf is not None
+        ]
+
+        summary = BenchmarkSummary(
+            decode_mode=decode_mode,
+            streaming=streaming,
+            concurrency=concurrency,
+            num_requests=len(results),
+            num_errors=len(results) - len(ok_results),
+            wall_seconds=wall_seconds,
+            audio_seconds=sum(result.audio_seconds for result in ok_results),
+            time_to_transcript={f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+            real_time_factor={f"p{p}": percentile(rtfs, p) for p in PERCENTILES},
+        )
+
+        if monitor is not None:
+            summary.cpu_seconds = monitor.cpu_seconds
+            summary.peak_rss_bytes = monitor.peak_rss_bytes
+            summary.mean_rss_bytes = monitor.mean_rss_bytes
+
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "BenchmarkSummary":
+        return BenchmarkSummary(**data)
+
+
+def format_summaries(summaries: Sequence[BenchmarkSummary]) -> str:
+    """Format summaries as a table with one row per run."""
+    header = (
+        "mode/streaming",
+        "conc",
+        "reqs",
+        "errs",
+        *(f"ttt_p{p}" for p in PERCENTILES),
+        *(f"rtf_p{p}" for p in PERCENTILES),
+        "cpu%",
+        "rss_mb",
+    )
+    rows = [header]
+    for summary in summaries:
+        cpu_percent: Optional[float] = None
+        if (summary.cpu_seconds is not None) and (summary.wall_seconds > 0):
+            cpu_percent = 100 * summary.cpu_seconds / summary.wall_seconds
+
+        peak_rss_mb: Optional[float] = None
+        if summary.peak_rss_bytes is not None:
+            peak_rss_mb = summary.peak_rss_bytes / (1024 * 1024)
+
+        rows.append(
+            (
+                summary.label,
+                str(summary.concurrency),
+                str(summary.num_requests),
+                str(summary.num_errors),
+                *(
+                    _format_number(summary.time_to_transcript.get(f"p{p}"))
+                    for p in PERCENTILES
+                ),
+                *(
+                    _format_number(summary.real_time_factor.get(f"p{p}"))
+                    for p in PERCENTILES
+                ),
+                _format_number(cpu_percent, 1),
+                _format_number(peak_rss_mb, 1),
+            )
+        )
+
+    widths = [max(len(row[col_idx]) for row in rows) for col_idx in range(len(header))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def _format_number(value: Optional[float], digits: int = 3) -> str:
+    if value is None:
+        return "-"
+
+    return f"{value:.{digits}f}"
+
+
+# -----------------------------------------------------------------------------
+
+
+def find_wavs(paths: Iterable[Path]) -> List[Path]:
+    """Get WAV files, including all WAV files in directories."""
+    wav_paths: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            wav_paths.extend(sorted(path.rglob("*.wav")))
+        else:
+            wav_paths.append(path)
+
+    return wav_paths
+
+
+async def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "wav", nargs="*", help="WAV files or directories with WAV files"
+    )
+    parser.add_argument("--uri", help="unix:// or tcp:// URI of the server")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of requests to send at the same time (default: 1)",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        help="Total number of requests (default: one per WAV file)",
+    )
+    parser.add_argument(
+        "--samples-per-chunk",
+        type=int,
+        default=1600,
+        help="Samples in each audio chunk (default: 1600)",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Send audio this many times faster than real time, 0 for no delay (default: 1)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="Seconds to wait for each transcript, 0 for no limit (default: 60)",
+    )
+    parser.add_argument("--model-name", help="Model name sent in transcribe event")
+    parser.add_argument("--language", help="Language sent in transcribe event")
+    #
+    parser.add_argument(
+        "--server-pid",
+        type=int,
+        help="Process id of the server to sample CPU and RSS from /proc",
+    )
+    parser.add_argument(
+        "--sample-seconds",
+        type=float,
+        default=0.25,
+        help="Seconds between CPU/RSS samples (default: 0.25)",
+    )
+    #
+    parser.add_argument(
+        "--decode-mode",
+        choices=DECODE_MODES,
+        default="arpa",
+        help="Decode mode of the server, used to label results (default: arpa)",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Server was started with --streaming, used to label results",
+    )
+    parser.add_argument(
+        "--output", help="Append summary of the run to a JSON lines file"
+    )
+    parser.add_argument(
+        "--report",
+        nargs="+",
+        help="Print runs saved with --output and exit",
+    )
+    parser.add_argument("--debug", action="store_true", help="Log DEBUG messages")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    if args.report:
+        summaries: List[BenchmarkSummary] = []
+        for report_path in args.report:
+            with open(report_path, "r", encoding="utf-8") as report_file:
+                for line in report_file:
+                    line = line.strip()
+                    if line:
+                        summaries.append(BenchmarkSummary.from_dict(json.loads(line)))
+
+        print(format_summaries(summaries))
+        return
+
+    if not args.uri:
+        parser.error("--uri is required")
+
+    wav_paths = find_wavs(Path(p) for p in args.wav)
+    if not wav_paths:
+        parser.error("No WAV files")
+
+    wavs = [WavAudio.load(wav_path) for wav_path in wav_paths]
+    num_requests = args.requests if args.requests else len(wavs)
+    _LOGGER.info(
+        "Sending %s request(s) from %s WAV file(s) with concurrency %s",
+        num_requests,
+        len(wavs),
+        args.concurrency,
+    )
+
+    monitor: Optional[ProcessMonitor] = None
+    if args.server_pid is not None:
+        monitor = ProcessMonitor(args.server_pid, interval=args.sample_seconds)
+        monitor.start()
+
+    start_time = time.monotonic()
+    try:
+        results = await run_benchmark(
+            args.uri,
+            wavs,
+            num_requests,
+            concurrency=args.concurrency,
+            timeout=args.timeout if args.timeout > 0 else None,
+            samples_per_chunk=args.samples_per_chunk,
+            speed=args.speed,
+            model_name=args.model_name,
+            language=args.language,
+        )
+    finally:
+        if monitor is not None:
+            await monitor.stop()
+
+    summary = BenchmarkSummary.from_results(
+        results,
+        decode_mode=args.decode_mode,
+        streaming=args.streaming,
+        concurrency=args.concurrency,
+        wall_seconds=time.monotonic() - start_time,
+        monitor=monitor,
+    )
+    print(format_summaries([summary]))
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as output_file:
+            print(json.dumps(summary.to_dict()), file=output_file)
+
+
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
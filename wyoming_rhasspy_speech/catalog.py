@@ -0,0 +1,185 @@
+"""In-memory catalog of trained models."""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from wyoming.info import AsrModel, AsrProgram, Attribution, Info
+
+if TYPE_CHECKING:
+    from .shared import AppSettings
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _CatalogData:
+    # [(model_id, suffix)]
+    trained_models: List[Tuple[str, Optional[str]]]
+
+    info: Info
+
+    # language prefix -> model name
+    language_index: Dict[str, str]
+
+    # directory -> mtime when catalog was built
+    dir_mtimes: Dict[str, float]
+
+
+class ModelCatalog:
+    """Caches trained models and Wyoming info.
+
+    The catalog is rebuilt after invalidate() is called, or when the modification
+    time of the models/training directories has changed. Modification times are
+    checked at most once every check_seconds.
+    """
+
+    def __init__(
+        self, settings: "AppSettings", check_seconds: Optional[float] = None
+    ) -> None:
+        self.settings = settings
+        self.check_seconds = check_seconds
+
+        self._data: Optional[_CatalogData] = None
+        self._last_check_time = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Rebuild catalog on next access."""
+        with self._lock:
+            self._data = None
+
+    @property
+    def trained_models(self) -> List[Tuple[str, Optional[str]]]:
+        return self._get_data().trained_models
+
+    @property
+    def info(self) -> Info:
+        return self._get_data().info
+
+    def model_for_language(self, language: str) -> Optional[str]:
+        """Get the longest model name that starts with the language."""
+        return self._get_data().language_index.get(language)
+
+    def _get_data(self) -> _CatalogData:
+        with self._lock:
+            if (self._data is not None) and (self.check_seconds is not None):
+                now = time.monotonic()
+                if (now - self._last_check_time) >= self.check_seconds:
+                    self._last_check_time = now
+                    if self._get_dir_mtimes() != self._data.dir_mtimes:
+                        _LOGGER.debug("Model directories changed")
+                        self._data = None
+
+            if self._data is None:
+                self._data = self._build()
+                self._last_check_time = time.monotonic()
+
+            return self._data
+
+    def _get_dir_mtimes(self) -> Dict[str, float]:
+        dir_mtimes: Dict[str, float] = {}
+        for base_dir in (self.settings.models_dir, self.settings.train_dir):
+            if not base_dir.is_dir():
+                continue
+
+            dir_mtimes[str(base_dir)] = base_dir.stat().st_mtime
+            if base_dir == self.settings.train_dir:
+                # training dirs are created inside train/<model_id>
+                for model_dir in base_dir.iterdir():
+                    if model_dir.is_dir():
+                        dir_mtimes[str(model_dir)] = model_dir.stat().st_mtime
+
+        return dir_mtimes
+
+    def _build(self) -> _CatalogData:
+        _LOGGER.debug("Building model catalog")
+        dir_mtimes = self._get_dir_mtimes()
+
+        # [(model_id, suffix)]
+        suffix: Optional[str]
+        trained_models: List[Tuple[str, Optional[str]]] = []
+
+        if self.settings.models_dir.is_dir():
+            for model_dir in self.settings.models_dir.iterdir():
+                if not model_dir.is_dir():
+                    continue
+
+                model_id = model_dir.name
+                trained_model_dir = self.settings.model_train_dir(model_id)
+                if trained_model_dir.is_dir():
+                    trained_models.append((model_id, None))
+
+                suffixes = self.settings.get_suffixes(model_id)
+                for suffix in suffixes:
+                    trained_model_dir = self.settings.model_train_dir(model_id, suffix)
+                    if trained_model_dir.is_dir():
+                        trained_models.append((model_id, suffix))
+
+        if not trained_models:
+            _LOGGER.warning("No trained models found.")
+
+        # program -> language -> (model_id, suffix)
+        language_support: Dict[str, Dict[str, Tuple[str, Optional[str]]]] = defaultdict(
+            dict
+        )
+        for model_id, suffix in trained_models:
+            # en_US-rhasspy -> rhasspy
+            language = model_id.split("-", maxsplit=1)[0]
+            if suffix:
+                program = f"rhasspy-{suffix}"
+            else:
+                program = "rhasspy"
+
+            language_support[program][language] = (model_id, suffix)
+
+        info = Info(
+            asr=[
+                AsrProgram(
+                    name=program,
+                    description="A fixed input speech-to-text system based on Kaldi",
+                    attribution=Attribution(
+                        name="synesthesiam",
+                        url="https://github.com/synesthesiam/rhasspy-speech",
+                    ),
+                    installed=True,
+                    version="1.0.0",
+                    models=[
+                        AsrModel(
+                            name=(
+                                model_id if (suffix is None) else f"{model_id}/{suffix}"
+                            ),
+                            description=model_id,
+                            attribution=Attribution(name="", url=""),
+                            installed=True,
+                            version=None,
+                            languages=[language],
+                        )
+                        for language, (model_id, suffix) in languages.items()
+                    ],
+                )
+                for program, languages in language_support.items()
+            ],
+        )
+        _LOGGER.debug(info)
+
+        # Longest model names of the first program are preferred for a prefix
+        language_index: Dict[str, str] = {}
+        model_names = sorted(
+            (model.name for model in info.asr[0].models) if info.asr else [],
+            key=len,
+            reverse=True,
+        )
+        for model_name in model_names:
+            for prefix_len in range(1, len(model_name) + 1):
+                language_index.setdefault(model_name[:prefix_len], model_name)
+
+        return _CatalogData(
+            trained_models=trained_models,
+            info=info,
+            language_index=language_index,
+            dir_mtimes=dir_mtimes,
+        )
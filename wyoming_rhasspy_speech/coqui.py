@@ -0,0 +1,68 @@
+"""Coqui STT workers that are reused between utterances."""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Optional
+
+from rhasspy_speech.coqui_stt import CoquiSttTranscriber
+from rhasspy_speech.tools import KaldiTools
+
+from .pool import KeyedPool
+
+if TYPE_CHECKING:
+    from .shared import AppSettings
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CoquiSttPool(KeyedPool[str, CoquiSttTranscriber]):
+    """Warm Coqui STT workers (stt_onlyprobs processes) per model id.
+
+    A new stream is started on each worker for every utterance. Discarded
+    workers are stopped on the event loop that first acquired a worker, so
+    models can be invalidated from the web server thread.
+    """
+
+    def __init__(
+        self,
+        settings: "AppSettings",
+        get_tools: Callable[[], KaldiTools],
+    ) -> None:
+        super().__init__(
+            self._create_transcriber,
+            max_idle=settings.coqui_pool_size,
+            idle_timeout=settings.coqui_idle_timeout,
+            on_discard=self._stop_transcriber,
+        )
+        self.settings = settings
+        self.get_tools = get_tools
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def invalidate_model(self, model_id: str) -> None:
+        """Stop workers for a model after it has been re-trained."""
+        self.invalidate(lambda key: key == model_id)
+
+    def _create_transcriber(self, model_id: str) -> CoquiSttTranscriber:
+        _LOGGER.debug("Creating Coqui STT transcriber: %s", model_id)
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        return CoquiSttTranscriber(
+            model_dir=self.settings.model_data_dir(model_id),
+            exe_path=self.settings.tools_dir / "stt_onlyprobs",
+            tools=self.get_tools(),
+        )
+
+    def _stop_transcriber(self, transcriber: CoquiSttTranscriber) -> None:
+        if (self._loop is None) or self._loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(
+            self._stop_transcriber_async(transcriber), self._loop
+        )
+
+    async def _stop_transcriber_async(self, transcriber: CoquiSttTranscriber) -> None:
+        try:
+            await transcriber.stop()
+        except Exception:
+            _LOGGER.exception("Unexpected error stopping Coqui STT transcriber")
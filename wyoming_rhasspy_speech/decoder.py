@@ -0,0 +1,96 @@
+"""Kaldi transcribers and the model files they decode with."""
+
+from pathlib import Path
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Union
+
+from rhasspy_speech.const import LangSuffix
+from rhasspy_speech.tools import KaldiTools
+from rhasspy_speech.transcribe_stream import KaldiNnet3StreamTranscriber
+from rhasspy_speech.transcribe_wav import KaldiNnet3WavTranscriber
+
+if TYPE_CHECKING:
+    from .shared import AppSettings
+
+KaldiTranscriber = Union[KaldiNnet3WavTranscriber, KaldiNnet3StreamTranscriber]
+
+
+class DecoderKey(NamedTuple):
+    model_id: str
+    suffix: Optional[str]
+    decode_mode: LangSuffix
+    degraded: bool = False
+
+
+def graph_dir_name(decode_mode: LangSuffix) -> str:
+    if decode_mode == LangSuffix.GRAMMAR:
+        # Strict grammar
+        return "graph_grammar"
+
+    # Language model
+    return "graph_arpa"
+
+
+def get_lang_dirs(
+    settings: "AppSettings", model_id: str, suffix: Optional[str] = None
+) -> List[Path]:
+    """Get lang directories for the decode mode (old and new if rescoring)."""
+    data_dir = settings.model_train_dir(model_id, suffix) / "data"
+    if settings.decode_mode == LangSuffix.ARPA_RESCORE:
+        return [data_dir / "lang_arpa", data_dir / "lang_arpa_rescore"]
+
+    return [data_dir / f"lang_{settings.decode_mode.value}"]
+
+
+def get_model_paths(
+    settings: "AppSettings", model_id: str, suffix: Optional[str] = None
+) -> List[Path]:
+    """Get the acoustic model, graph, and lexicon files used for decoding."""
+    model_data_dir = settings.model_data_dir(model_id)
+    model_train_dir = settings.model_train_dir(model_id, suffix)
+
+    paths = [
+        model_data_dir / "model",
+        model_data_dir / "lexicon.db",
+        model_train_dir / graph_dir_name(settings.decode_mode),
+    ]
+    paths.extend(get_lang_dirs(settings, model_id, suffix))
+
+    return paths
+
+
+def create_transcriber(
+    settings: "AppSettings", key: DecoderKey, tools: KaldiTools
+) -> KaldiTranscriber:
+    """Create a Kaldi transcriber for a model.
+
+    Transcribers only hold their settings and paths, and rhasspy-speech starts
+    the Kaldi decoder for each utterance, so they are created per decode.
+    """
+    model_data_dir = settings.model_data_dir(key.model_id)
+    graph_dir: Path = settings.model_train_dir(
+        key.model_id, key.suffix
+    ) / graph_dir_name(key.decode_mode)
+
+    # Non-streaming audio is piped from memory unless WAV files are requested
+    transcriber_class = (
+        KaldiNnet3WavTranscriber
+        if (settings.decode_wav_file and (not settings.streaming))
+        else KaldiNnet3StreamTranscriber
+    )
+    if key.degraded:
+        # Cheaper search when the decode queue is deep
+        max_active = settings.degraded_max_active
+        beam = settings.degraded_beam
+    else:
+        max_active = settings.max_active
+        beam = settings.beam
+
+    return transcriber_class(
+        model_dir=model_data_dir,
+        graph_dir=graph_dir,
+        tools=tools,
+        max_active=max_active,
+        lattice_beam=settings.lattice_beam,
+        acoustic_scale=settings.acoustic_scale,
+        beam=beam,
+    )
@@ -0,0 +1,32 @@
+"""Wyoming events that aren't part of the wyoming package."""
+
+from dataclasses import dataclass
+
+from wyoming.event import Event, Eventable
+
+_PARTIAL_TRANSCRIPT_TYPE = "partial-transcript"
+
+
+@dataclass
+class PartialTranscript(Eventable):
+    """Interim hypothesis for the audio received so far.
+
+    Sent zero or more times before the final Transcript while audio is still
+    streaming. Each partial transcript replaces the previous one. Clients that
+    don't know this event type can ignore it.
+    """
+
+    text: str
+    """Text transcription of the audio so far"""
+
+    @staticmethod
+    def is_type(event_type: str) -> bool:
+        return event_type == _PARTIAL_TRANSCRIPT_TYPE
+
+    def event(self) -> Event:
+        return Event(type=_PARTIAL_TRANSCRIPT_TYPE, data={"text": self.text})
+
+    @staticmethod
+    def from_event(event: Event) -> "PartialTranscript":
+        assert event.data is not None
+        return PartialTranscript(text=event.data["text"])
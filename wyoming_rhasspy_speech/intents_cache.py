@@ -0,0 +1,70 @@
+"""On-disk cache of parsed intents, keyed by the content of their source files."""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from hassil._resources import __version__ as hassil_version
+
+_LOGGER = logging.getLogger(__name__)
+
+# Change when the way intents are assembled from source files changes
+CACHE_VERSION = 1
+
+
+def get_cache_key(source_paths: Iterable[Path], *extra: str) -> str:
+    """Hash the contents of source files with hassil's version and extra values."""
+    hasher = hashlib.sha256()
+    hasher.update(f"version={CACHE_VERSION}\n".encode("utf-8"))
+    hasher.update(f"hassil={hassil_version}\n".encode("utf-8"))
+
+    for value in extra:
+        hasher.update(f"extra={value}\n".encode("utf-8"))
+
+    for source_path in source_paths:
+        hasher.update(f"source={source_path.name}\n".encode("utf-8"))
+        hasher.update(hashlib.sha256(source_path.read_bytes()).digest())
+
+    return hasher.hexdigest()
+
+
+def load_cached(cache_path: Path, key: str) -> Optional[Any]:
+    """Load a cached value if it was saved with the same key."""
+    try:
+        with open(cache_path, "rb") as cache_file:
+            cached_key, value = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Corrupt or written by an incompatible version
+        _LOGGER.debug("Ignoring invalid cache: %s", cache_path, exc_info=True)
+        return None
+
+    if cached_key != key:
+        return None
+
+    return value
+
+
+def save_cached(cache_path: Path, key: str, value: Any) -> None:
+    """Save a value to the cache, replacing any previous value."""
+    temp_path: Optional[Path] = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial data
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=cache_path.parent, suffix=".tmp", delete=False
+        ) as temp_file:
+            temp_path = Path(temp_file.name)
+            pickle.dump((key, value), temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temp_path, cache_path)
+    except Exception:
+        _LOGGER.warning("Failed to write cache: %s", cache_path, exc_info=True)
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
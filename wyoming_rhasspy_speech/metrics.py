@@ -0,0 +1,416 @@
+"""Counters and histograms exposed in the Prometheus text format."""
+
+import bisect
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    from .coqui import CoquiSttPool
+    from .scheduler import DecodeScheduler
+
+LabelValues = Tuple[str, ...]
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+BYTES_BUCKETS = tuple(2**power for power in range(10, 26, 2))
+
+
+def _format_labels(label_names: Sequence[str], label_values: LabelValues) -> str:
+    if not label_names:
+        return ""
+
+    labels = ",".join(
+        f'{name}="{value}"' for name, value in zip(label_names, label_values)
+    )
+    return "{" + labels + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+
+    return repr(float(value))
+
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, description, label_names)
+        self._values: Dict[LabelValues, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        with self._lock:
+            self._values[self._label_values(labels)] += amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(
+                    f"{self.name}{_format_labels(self.label_names, label_values)} "
+                    f"{_format_value(value)}"
+                )
+
+        return lines
+
+
+class _CallbackMetric(Metric):
+    """Value that is read from a callback when rendered."""
+
+    def __init__(
+        self, name: str, description: str, get_value: Callable[[], float]
+    ) -> None:
+        super().__init__(name, description)
+        self.get_value = get_value
+
+    def render(self) -> List[str]:
+        return super().render() + [f"{self.name} {_format_value(self.get_value())}"]
+
+
+class Gauge(_CallbackMetric):
+    """Current value, such as a queue length."""
+
+    metric_type = "gauge"
+
+
+class CallbackCounter(_CallbackMetric):
+    """Total that only increases, kept by another object."""
+
+    metric_type = "counter"
+
+
+@dataclass
+class _HistogramValues:
+    bucket_counts: List[int]
+    count: int = 0
+    total: float = 0.0
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        buckets: Sequence[float] = SECONDS_BUCKETS,
+        label_names: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, description, label_names)
+        self.buckets = sorted(buckets)
+        self._values: Dict[LabelValues, _HistogramValues] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        label_values = self._label_values(labels)
+        with self._lock:
+            values = self._values.get(label_values)
+            if values is None:
+                values = _HistogramValues(bucket_counts=[0] * len(self.buckets))
+                self._values[label_values] = values
+
+            bucket_idx = bisect.bisect_left(self.buckets, value)
+            if bucket_idx < len(self.buckets):
+                values.bucket_counts[bucket_idx] += 1
+
+            values.count += 1
+            values.total += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        label_names = self.label_names + ("le",)
+        with self._lock:
+            for label_values, values in sorted(self._values.items()):
+                cumulative_count = 0
+                for bucket, bucket_count in zip(self.buckets, values.bucket_counts):
+                    cumulative_count += bucket_count
+                    bucket_labels = _format_labels(
+                        label_names, label_values + (_format_value(bucket),)
+                    )
+                    lines.append(
+                        f"{self.name}_bucket{bucket_labels} {cumulative_count}"
+                    )
+
+                inf_labels = _format_labels(label_names, label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{inf_labels} {values.count}")
+
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(values.total)}")
+                lines.append(f"{self.name}_count{labels} {values.count}")
+
+        return lines
+
+
+_M = TypeVar("_M", bound=Metric)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+
+    def add(self, metric: _M) -> _M:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class UtteranceStats:
+    """Timings and counts for a single utterance."""
+
+    start_time: float = field(default_factory=time.monotonic)
+
+    # stage -> seconds
+    stage_seconds: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    audio_seconds: float = 0.0
+    trimmed_seconds: float = 0.0
+    num_clipped_samples: int = 0
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage] += seconds
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Add time spent in the block to a stage."""
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(stage, time.monotonic() - start_time)
+
+    @property
+    def real_time_factor(self) -> Optional[float]:
+        """Decode seconds divided by audio seconds for buffered audio.
+
+        Streaming decodes overlap with the audio, so they record the time after
+        the audio ends as "finalize" instead and have no real-time factor.
+        """
+        decode_seconds = self.stage_seconds.get("decode")
+        if (decode_seconds is None) or (self.audio_seconds <= 0):
+            return None
+
+        return decode_seconds / self.audio_seconds
+
+
+class ServerMetrics:
+    """Metrics for the Wyoming server."""
+
+    def __init__(self) -> None:
+        self.registry = MetricsRegistry()
+
+        self.utterances = self.registry.add(
+            Counter(
+                "rhasspy_speech_utterances_total",
+                "Transcribed utterances",
+                label_names=("decode_mode", "streaming"),
+            )
+        )
+        self.stage_seconds = self.registry.add(
+            Histogram(
+                "rhasspy_speech_stage_seconds",
+                "Seconds spent per utterance in each processing stage",
+                label_names=("stage", "decode_mode", "streaming"),
+            )
+        )
+        self.audio_seconds = self.registry.add(
+            Histogram(
+                "rhasspy_speech_audio_seconds",
+                "Seconds of audio per utterance",
+                buckets=(0.5, 1, 2, 3, 5, 7.5, 10, 15, 30, 60),
+                label_names=("decode_mode", "streaming"),
+            )
+        )
+        self.real_time_factor = self.registry.add(
+            Histogram(
+                "rhasspy_speech_real_time_factor",
+                "Decode seconds divided by audio seconds for buffered audio",
+                buckets=RATIO_BUCKETS,
+                label_names=("decode_mode", "streaming"),
+            )
+        )
+        self.speculative_decodes = self.registry.add(
+            Counter(
+                "rhasspy_speech_speculative_decodes_total",
+                "Decodes started during a pause in speech",
+                label_names=("result",),
+            )
+        )
+        self.audio_queue_high_water_bytes = self.registry.add(
+            Histogram(
+                "rhasspy_speech_audio_queue_high_water_bytes",
+                "Largest streaming audio queue per utterance",
+                buckets=BYTES_BUCKETS,
+            )
+        )
+        self.audio_queue_overflows = self.registry.add(
+            Counter(
+                "rhasspy_speech_audio_queue_overflows_total",
+                "Audio chunks that arrived when the streaming audio queue was full",
+                label_names=("policy",),
+            )
+        )
+        self.audio_queue_dropped_bytes = self.registry.add(
+            Counter(
+                "rhasspy_speech_audio_queue_dropped_bytes_total",
+                "Bytes of audio dropped from full streaming audio queues",
+            )
+        )
+        self.clipped_samples = self.registry.add(
+            Counter(
+                "rhasspy_speech_clipped_samples_total",
+                "Samples clipped after applying the volume multiplier",
+            )
+        )
+        self.trimmed_audio_seconds = self.registry.add(
+            Counter(
+                "rhasspy_speech_trimmed_audio_seconds_total",
+                "Seconds of non-speech audio trimmed before decoding",
+            )
+        )
+        self.audio_buffer_overflows = self.registry.add(
+            Counter(
+                "rhasspy_speech_audio_buffer_overflows_total",
+                "Audio chunks that arrived when an utterance's audio buffer was full",
+                label_names=("policy",),
+            )
+        )
+        self.audio_buffer_dropped_bytes = self.registry.add(
+            Counter(
+                "rhasspy_speech_audio_buffer_dropped_bytes_total",
+                "Bytes of audio dropped from full utterance audio buffers",
+            )
+        )
+        self.buffer_high_water_bytes = self.registry.add(
+            Histogram(
+                "rhasspy_speech_buffer_high_water_bytes",
+                "Largest audio buffer per connection",
+                buckets=BYTES_BUCKETS,
+            )
+        )
+
+    def observe_utterance(
+        self, stats: UtteranceStats, decode_mode: str, streaming: bool
+    ) -> None:
+        labels = {"decode_mode": decode_mode, "streaming": str(streaming).lower()}
+        self.utterances.inc(**labels)
+        for stage, seconds in stats.stage_seconds.items():
+            self.stage_seconds.observe(seconds, stage=stage, **labels)
+
+        self.audio_seconds.observe(stats.audio_seconds, **labels)
+
+        real_time_factor = stats.real_time_factor
+        if real_time_factor is not None:
+            self.real_time_factor.observe(real_time_factor, **labels)
+
+        if stats.num_clipped_samples > 0:
+            self.clipped_samples.inc(stats.num_clipped_samples)
+
+        if stats.trimmed_seconds > 0:
+            self.trimmed_audio_seconds.inc(stats.trimmed_seconds)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+def create_server_metrics(
+    decode_scheduler: "DecodeScheduler",
+    coqui_pool: "CoquiSttPool",
+) -> ServerMetrics:
+    """Create server metrics, including values read from shared objects."""
+    metrics = ServerMetrics()
+    registry = metrics.registry
+
+    registry.add(
+        Gauge(
+            "rhasspy_speech_decodes_active",
+            "Decodes currently running",
+            lambda: decode_scheduler.num_active,
+        )
+    )
+    registry.add(
+        Gauge(
+            "rhasspy_speech_decodes_queued",
+            "Decodes waiting for a slot",
+            lambda: decode_scheduler.num_queued,
+        )
+    )
+    registry.add(
+        CallbackCounter(
+            "rhasspy_speech_decodes_rejected_total",
+            "Decodes rejected because the queue was full or the deadline passed",
+            lambda: decode_scheduler.num_rejected,
+        )
+    )
+    registry.add(
+        CallbackCounter(
+            "rhasspy_speech_decodes_degraded_total",
+            "Decodes run with a cheaper beam because the queue was deep",
+            lambda: decode_scheduler.num_degraded,
+        )
+    )
+    registry.add(
+        Gauge(
+            "rhasspy_speech_coqui_workers_idle",
+            "Idle Coqui STT processes",
+            coqui_pool.num_idle,
+        )
+    )
+    registry.add(
+        Gauge(
+            "rhasspy_speech_coqui_workers_busy",
+            "Coqui STT processes checked out by clients",
+            coqui_pool.num_checked_out,
+        )
+    )
+
+    return metrics
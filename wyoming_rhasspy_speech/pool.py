@@ -0,0 +1,169 @@
+"""Keyed pools of reusable objects shared between client connections."""
+
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+_K = TypeVar("_K", bound=Hashable)
+_T = TypeVar("_T")
+
+
+@dataclass
+class _IdleItem(Generic[_T]):
+    item: _T
+    last_used: float
+
+
+class KeyedPool(Generic[_K, _T]):
+    """Keeps up to max_idle objects per key ready for reuse.
+
+    Objects are created on demand when none are idle, so acquire never waits.
+    Objects beyond max_idle are discarded on release, and idle objects are
+    discarded after idle_timeout seconds. on_release is called before an object
+    goes back into the pool so it can be reset.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[_K], _T],
+        max_idle: int = 1,
+        idle_timeout: Optional[float] = None,
+        on_discard: Optional[Callable[[_T], None]] = None,
+        on_release: Optional[Callable[[_T], None]] = None,
+    ) -> None:
+        self.factory = factory
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.on_discard = on_discard
+        self.on_release = on_release
+
+        self._idle: Dict[_K, List[_IdleItem[_T]]] = defaultdict(list)
+        self._generation: Dict[_K, int] = defaultdict(int)
+
+        # id(item) -> (key, generation)
+        self._checked_out: Dict[int, Tuple[_K, int]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: _K) -> _T:
+        """Get an idle object for key or create a new one."""
+        discarded: List[_T] = []
+        item: Optional[_T] = None
+        with self._lock:
+            discarded.extend(self._prune(time.monotonic()))
+            idle_items = self._idle.get(key)
+            if idle_items:
+                item = idle_items.pop().item
+
+        self._discard_all(discarded)
+
+        if item is None:
+            item = self.factory(key)
+
+        with self._lock:
+            self._checked_out[id(item)] = (key, self._generation[key])
+
+        return item
+
+    def preload(self, key: _K, count: Optional[int] = None) -> None:
+        """Create idle objects for key up to count (default: max_idle)."""
+        if count is None:
+            count = self.max_idle
+
+        with self._lock:
+            num_missing = max(0, min(count, self.max_idle) - len(self._idle[key]))
+
+        new_items = [self.factory(key) for _ in range(num_missing)]
+        now = time.monotonic()
+        with self._lock:
+            self._idle[key].extend(_IdleItem(item, now) for item in new_items)
+
+    def release(self, item: _T) -> None:
+        """Return an object to the pool."""
+        if self.on_release is not None:
+            try:
+                self.on_release(item)
+            except Exception:
+                # Don't reuse objects that can't be reset
+                self.discard(item)
+                raise
+
+        keep = False
+        with self._lock:
+            key_generation = self._checked_out.pop(id(item), None)
+            if key_generation is not None:
+                key, generation = key_generation
+                idle_items = self._idle[key]
+                if (generation == self._generation[key]) and (
+                    len(idle_items) < self.max_idle
+                ):
+                    idle_items.append(_IdleItem(item, time.monotonic()))
+                    keep = True
+
+        if not keep:
+            self._discard_all([item])
+
+    def discard(self, item: _T) -> None:
+        """Discard a checked out object instead of returning it."""
+        with self._lock:
+            self._checked_out.pop(id(item), None)
+
+        self._discard_all([item])
+
+    def invalidate(self, predicate: Callable[[_K], bool]) -> None:
+        """Discard idle objects for matching keys.
+
+        Objects that are checked out are discarded when released.
+        """
+        discarded: List[_T] = []
+        with self._lock:
+            for key in list(self._idle.keys()):
+                if predicate(key):
+                    discarded.extend(idle.item for idle in self._idle.pop(key))
+
+            for key in list(self._generation.keys()):
+                if predicate(key):
+                    self._generation[key] += 1
+
+        self._discard_all(discarded)
+
+    def clear(self) -> None:
+        """Discard all idle objects."""
+        self.invalidate(lambda key: True)
+
+    def num_idle(self) -> int:
+        with self._lock:
+            return sum(len(idle_items) for idle_items in self._idle.values())
+
+    def num_checked_out(self) -> int:
+        with self._lock:
+            return len(self._checked_out)
+
+    def _prune(self, now: float) -> List[_T]:
+        """Remove objects idle longer than the timeout. Lock must be held."""
+        if self.idle_timeout is None:
+            return []
+
+        discarded: List[_T] = []
+        for key in list(self._idle.keys()):
+            keep_items: List[_IdleItem[_T]] = []
+            for idle in self._idle[key]:
+                if (now - idle.last_used) < self.idle_timeout:
+                    keep_items.append(idle)
+                else:
+                    discarded.append(idle.item)
+
+            if keep_items:
+                self._idle[key] = keep_items
+            else:
+                self._idle.pop(key)
+
+        return discarded
+
+    def _discard_all(self, items: List[_T]) -> None:
+        if self.on_discard is None:
+            return
+
+        for item in items:
+            self.on_discard(item)
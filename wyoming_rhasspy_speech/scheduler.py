@@ -0,0 +1,161 @@
+"""Server-wide scheduling of decodes."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import AsyncIterator, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class QueuePolicy(str, Enum):
+    FIFO = "fifo"
+    """First come, first served."""
+
+    SHORTEST = "shortest"
+    """Shortest audio first, then first come, first served."""
+
+
+class DecodeRejectedError(Exception):
+    """Decode was rejected because the queue was full or its deadline passed."""
+
+
+@dataclass
+class DecodeSlot:
+    degraded: bool
+    """True if the queue was deep enough that a cheaper decode should be used."""
+
+    queued_seconds: float
+    """Seconds spent waiting for the slot."""
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: float
+    order: int
+    future: "asyncio.Future[None]" = field(compare=False)
+
+
+class DecodeScheduler:
+    """Limits the number of concurrent decodes and queues the rest.
+
+    Decodes are rejected when max_queued decodes are already waiting, and are
+    marked as degraded when degrade_queued or more decodes are waiting.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        policy: QueuePolicy = QueuePolicy.FIFO,
+        max_queued: Optional[int] = None,
+        degrade_queued: Optional[int] = None,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.policy = policy
+        self.max_queued = max_queued
+        self.degrade_queued = degrade_queued
+
+        self._num_active = 0
+        self._queue: List[_Waiter] = []
+        self._order = itertools.count()
+
+        self.num_rejected = 0
+        self.num_degraded = 0
+
+    @property
+    def num_active(self) -> int:
+        return self._num_active
+
+    @property
+    def num_queued(self) -> int:
+        return len(self._queue)
+
+    @property
+    def has_free_slot(self) -> bool:
+        """True if a slot is available without waiting."""
+        return self._has_capacity() and (not self._queue)
+
+    @asynccontextmanager
+    async def slot(
+        self, audio_seconds: float = 0.0, timeout: Optional[float] = None
+    ) -> AsyncIterator[DecodeSlot]:
+        """Wait for a decode slot.
+
+        Raises DecodeRejectedError if the queue is full or the slot isn't
+        available within timeout seconds.
+        """
+        start_time = time.monotonic()
+        num_queued = len(self._queue)
+        degraded = (self.degrade_queued is not None) and (
+            num_queued >= self.degrade_queued
+        )
+
+        if self.has_free_slot:
+            self._num_active += 1
+        else:
+            if (self.max_queued is not None) and (num_queued >= self.max_queued):
+                self.num_rejected += 1
+                raise DecodeRejectedError(f"Decode queue is full ({num_queued})")
+
+            await self._wait(audio_seconds, timeout)
+
+        if degraded:
+            self.num_degraded += 1
+
+        try:
+            yield DecodeSlot(
+                degraded=degraded, queued_seconds=time.monotonic() - start_time
+            )
+        finally:
+            self._release()
+
+    async def _wait(self, audio_seconds: float, timeout: Optional[float]) -> None:
+        priority = audio_seconds if self.policy == QueuePolicy.SHORTEST else 0.0
+        waiter = _Waiter(
+            priority,
+            next(self._order),
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queue, waiter)
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as err:
+            if waiter.future.done() and (not waiter.future.cancelled()):
+                # Slot was handed over just before cancellation
+                self._release()
+            else:
+                self._remove(waiter)
+
+            if isinstance(err, asyncio.TimeoutError):
+                self.num_rejected += 1
+                raise DecodeRejectedError(
+                    f"No decode slot within {timeout} second(s)"
+                ) from err
+
+            raise
+
+    def _has_capacity(self) -> bool:
+        return (self.max_concurrent is None) or (self._num_active < self.max_concurrent)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if waiter in self._queue:
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+
+    def _release(self) -> None:
+        self._num_active -= 1
+
+        # Hand slot over to next waiter
+        while self._queue and self._has_capacity():
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue
+
+            waiter.future.set_result(None)
+            self._num_active += 1
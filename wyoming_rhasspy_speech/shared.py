@@ -1,9 +1,30 @@
 import json
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from pysilero_vad import SileroVoiceActivityDetector
 from rhasspy_speech.const import LangSuffix
+from rhasspy_speech.tools import KaldiTools
+
+from .audio import SpeexSession
+from .audio_queue import OverflowPolicy
+from .catalog import ModelCatalog
+from .coqui import CoquiSttPool
+from .metrics import ServerMetrics, create_server_metrics
+from .pool import KeyedPool
+from .scheduler import DecodeScheduler, QueuePolicy
+
+VAD_KEY = "silero"
+
+
+def split_model_name(name: str) -> Tuple[str, Optional[str]]:
+    """Split <model_id>/<suffix> into (model_id, suffix)."""
+    name_parts = name.split("/", maxsplit=1)
+    if len(name_parts) == 2:
+        return name_parts[0], name_parts[1]
+
+    return name, None
 
 
 @dataclass
@@ -18,6 +39,10 @@ class AppSettings:
     vad_enabled: bool
     vad_threshold: float
     before_speech_seconds: float
+    endpoint_enabled: bool
+    endpoint_min_speech_seconds: float
+    endpoint_silence_seconds: float
+    endpoint_max_seconds: Optional[float]
 
     # Speex
     speex_enabled: bool
@@ -34,10 +59,47 @@ class AppSettings:
     beam: float
     nbest: int
     streaming: bool
+    decode_wav_file: bool
 
     decode_mode: LangSuffix
     arpa_rescore_order: Optional[int]
 
+    # Coqui STT processes
+    coqui_pool_size: int = 1
+    coqui_idle_timeout: Optional[float] = 600.0
+
+    # Decode scheduler
+    max_concurrent_decodes: Optional[int] = None
+    decode_queue_policy: QueuePolicy = QueuePolicy.FIFO
+    max_queued_decodes: Optional[int] = None
+    degrade_queued_decodes: Optional[int] = None
+    degraded_max_active: int = 3500
+    degraded_beam: float = 12.0
+    decode_timeout: Optional[float] = None
+
+    # Seconds of silence kept around speech when trimming buffered audio
+    trim_silence_padding: Optional[float] = None
+
+    # Seconds of silence before buffered audio is decoded speculatively
+    speculative_pause_seconds: Optional[float] = None
+
+    # Seconds of audio between partial transcripts when streaming
+    partial_interval: Optional[float] = None
+
+    # Limit on audio waiting for the streaming decoder
+    audio_queue_seconds: Optional[float] = 10.0
+    audio_queue_policy: OverflowPolicy = OverflowPolicy.BLOCK
+
+    # Limit on audio buffered for decoding in one utterance
+    audio_buffer_seconds: Optional[float] = 60.0
+    audio_buffer_policy: OverflowPolicy = OverflowPolicy.ABORT
+
+    # Seconds of audio in each frame sent to the streaming decoder
+    stream_frame_seconds: Optional[float] = 0.1
+
+    # Number of idle VAD/Speex sessions to keep
+    audio_pool_size: int = 4
+
     # Home Assistant
     hass_token: Optional[str] = None
     hass_websocket_uri: str = "homeassistant.local"
@@ -48,8 +110,16 @@ class AppSettings:
     # Web server
     auto_train_model_id: Optional[str] = None
 
+    # Models trained at the same time (None for one per CPU)
+    train_workers: Optional[int] = None
+
     # Misc
     model_id_for_language: Dict[str, str] = field(default_factory=dict)
+    catalog_check_seconds: Optional[float] = 60.0
+
+    @property
+    def speex_key(self) -> Tuple[int, int]:
+        return (self.speex_auto_gain, self.speex_noise_suppression)
 
     def model_data_dir(self, model_id: str) -> Path:
         return self.models_dir / model_id
@@ -91,6 +161,16 @@ class AppSettings:
 
         return self.train_dir / model_id / filename
 
+    def intents_cache_path(self, model_id: str, suffix: Optional[str] = None) -> Path:
+        if suffix:
+            filename = f"intents_{suffix}.pickle"
+        else:
+            filename = "intents.pickle"
+
+        # Subdirectory so that writing the cache doesn't change the mtime of
+        # train/<model_id>, which would rebuild the model catalog.
+        return self.train_dir / model_id / "cache" / filename
+
     def model_config(self, model_id: str) -> Dict[str, Any]:
         model_dir = self.model_data_dir(model_id)
         model_config_path = model_dir / "config.json"
@@ -108,3 +188,62 @@ class AppState:
     # Responses for unknown sentences
     # model_id -> response
     unknown_sentence_responses: Dict[str, str] = field(default_factory=dict)
+
+    # Coqui STT processes shared by all clients
+    coqui_pool: CoquiSttPool = field(init=False)
+
+    # Limits concurrent decodes for all clients
+    decode_scheduler: DecodeScheduler = field(init=False)
+
+    # Audio processors shared by all clients
+    vad_pool: KeyedPool[str, SileroVoiceActivityDetector] = field(init=False)
+    speex_pool: KeyedPool[Tuple[int, int], SpeexSession] = field(init=False)
+
+    # Trained models
+    model_catalog: ModelCatalog = field(init=False)
+
+    # Exposed on /metrics
+    metrics: ServerMetrics = field(init=False)
+
+    # Paths to Kaldi tools (loaded on first use)
+    _kaldi_tools: Optional[KaldiTools] = field(default=None, init=False)
+
+    def __post_init__(self) -> None:
+        self.model_catalog = ModelCatalog(
+            self.settings, check_seconds=self.settings.catalog_check_seconds
+        )
+        self.coqui_pool = CoquiSttPool(
+            self.settings,
+            get_tools=lambda: self.kaldi_tools,
+        )
+        self.decode_scheduler = DecodeScheduler(
+            max_concurrent=self.settings.max_concurrent_decodes,
+            policy=self.settings.decode_queue_policy,
+            max_queued=self.settings.max_queued_decodes,
+            degrade_queued=self.settings.degrade_queued_decodes,
+        )
+
+        self.metrics = create_server_metrics(self.decode_scheduler, self.coqui_pool)
+
+        self.vad_pool = KeyedPool(
+            lambda _key: SileroVoiceActivityDetector(),
+            max_idle=self.settings.audio_pool_size,
+            on_release=lambda vad: vad.reset(),
+        )
+        self.speex_pool = KeyedPool(
+            lambda key: SpeexSession(*key),
+            max_idle=self.settings.audio_pool_size,
+            on_release=lambda speex: speex.reset(),
+        )
+
+    @property
+    def kaldi_tools(self) -> KaldiTools:
+        if self._kaldi_tools is None:
+            self._kaldi_tools = KaldiTools.from_tools_dir(self.settings.tools_dir)
+
+        return self._kaldi_tools
+
+    def invalidate_model(self, model_id: str, suffix: Optional[str] = None) -> None:
+        """Drop cached state for a model after it has been re-trained or deleted."""
+        self.coqui_pool.invalidate_model(model_id)
+        self.model_catalog.invalidate()
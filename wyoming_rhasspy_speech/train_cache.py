@@ -0,0 +1,117 @@
+"""Hashes of training inputs, used to skip re-training unchanged models."""
+
+import hashlib
+import json
+import logging
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+STAMP_VERSION = 1
+STAMPS_DIR_NAME = "stamps"
+
+# Temporary files created by SQLite while the lexicon is open
+IGNORED_MODEL_SUFFIXES = ("-journal", "-wal", "-shm")
+
+
+def hash_training_inputs(input_paths: Iterable[Path], model_dir: Path) -> str:
+    """Hash sentence/list files and the speech model.
+
+    Sentence and list files are hashed by content. The speech model is large
+    and only changes when downloaded, so its files are hashed by path, size,
+    and modification time. Settings are added per lang suffix by
+    get_suffix_hash.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"version={STAMP_VERSION}\n".encode("utf-8"))
+    hasher.update(f"rhasspy_speech={_get_rhasspy_speech_version()}\n".encode("utf-8"))
+
+    for input_path in input_paths:
+        hasher.update(f"input={input_path.name}\n".encode("utf-8"))
+        hasher.update(hashlib.sha256(input_path.read_bytes()).digest())
+
+    if model_dir.is_dir():
+        for model_path in sorted(p for p in model_dir.rglob("*") if p.is_file()):
+            if model_path.name.endswith(IGNORED_MODEL_SUFFIXES):
+                continue
+
+            model_stat = model_path.stat()
+            model_info = ",".join(
+                (
+                    str(model_path.relative_to(model_dir)),
+                    str(model_stat.st_size),
+                    str(model_stat.st_mtime_ns),
+                )
+            )
+            hasher.update(f"model={model_info}\n".encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+def get_suffix_hash(inputs_hash: str, lang_suffix: str, **settings: object) -> str:
+    """Combine the hash of the inputs with the settings of one lang suffix."""
+    hasher = hashlib.sha256(inputs_hash.encode("utf-8"))
+    hasher.update(f"lang_suffix={lang_suffix}\n".encode("utf-8"))
+    for key, value in sorted(settings.items()):
+        hasher.update(f"{key}={value}\n".encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+def get_stale_suffixes(train_dir: Path, suffix_hashes: Dict[str, str]) -> List[str]:
+    """Get lang suffixes whose outputs are missing or were built from other inputs."""
+    stale_suffixes: List[str] = []
+    for lang_suffix, suffix_hash in suffix_hashes.items():
+        lang_dir = train_dir / "data" / f"lang_{lang_suffix}"
+        if (not lang_dir.is_dir()) or (
+            _read_stamp(train_dir, lang_suffix) != suffix_hash
+        ):
+            stale_suffixes.append(lang_suffix)
+
+    return stale_suffixes
+
+
+def write_stamp(train_dir: Path, lang_suffix: str, suffix_hash: str) -> None:
+    """Record the inputs that a lang suffix was trained from."""
+    stamp_path = _get_stamp_path(train_dir, lang_suffix)
+    stamp_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(stamp_path, "w", encoding="utf-8") as stamp_file:
+        json.dump({"version": STAMP_VERSION, "hash": suffix_hash}, stamp_file)
+
+
+def remove_stamp(train_dir: Path, lang_suffix: str) -> None:
+    """Mark a lang suffix as stale, e.g. before re-training it."""
+    _get_stamp_path(train_dir, lang_suffix).unlink(missing_ok=True)
+
+
+# -----------------------------------------------------------------------------
+
+
+def _get_stamp_path(train_dir: Path, lang_suffix: str) -> Path:
+    return train_dir / STAMPS_DIR_NAME / f"{lang_suffix}.json"
+
+
+def _read_stamp(train_dir: Path, lang_suffix: str) -> Optional[str]:
+    stamp_path = _get_stamp_path(train_dir, lang_suffix)
+    try:
+        with open(stamp_path, "r", encoding="utf-8") as stamp_file:
+            stamp = json.load(stamp_file)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        _LOGGER.warning("Invalid training stamp: %s", stamp_path)
+        return None
+
+    if stamp.get("version") != STAMP_VERSION:
+        return None
+
+    return stamp.get("hash")
+
+
+def _get_rhasspy_speech_version() -> str:
+    try:
+        return version("rhasspy-speech")
+    except PackageNotFoundError:
+        return ""
@@ -0,0 +1,272 @@
+"""Training jobs that run in the background instead of inside a web request."""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Log messages from training are copied into the job
+JOB_LOGGER_NAMES = ("rhasspy_speech", "wyoming_rhasspy_speech")
+
+
+class TrainJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class TrainJob:
+    """Training of one model, with its progress and log lines."""
+
+    def __init__(self, model_id: str, suffix: Optional[str], force: bool) -> None:
+        self.id = uuid.uuid4().hex
+        self.model_id = model_id
+        self.suffix = suffix
+        self.force = force
+
+        self.status = TrainJobStatus.QUEUED
+        self.stage = "queued"
+        self.error: Optional[str] = None
+        self.is_trained = False
+
+        self.created_time = time.time()
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+
+        self.lines: List[str] = []
+        self._condition = threading.Condition()
+
+        # Set while running
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._is_cancel_requested = False
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return (self.model_id, self.suffix)
+
+    @property
+    def is_done(self) -> bool:
+        return self.status in (
+            TrainJobStatus.SUCCEEDED,
+            TrainJobStatus.FAILED,
+            TrainJobStatus.CANCELLED,
+        )
+
+    def log(self, line: str) -> None:
+        with self._condition:
+            self.lines.append(line)
+            self._condition.notify_all()
+
+    def set_stage(self, stage: str) -> None:
+        """Report progress, e.g. "training"."""
+        self.stage = stage
+        self.log(f"Stage: {stage}")
+
+    def iter_lines(self) -> Iterator[str]:
+        """Yield log lines, waiting for new ones until the job is done."""
+        line_idx = 0
+        while True:
+            with self._condition:
+                while (line_idx >= len(self.lines)) and (not self.is_done):
+                    self._condition.wait()
+
+                new_lines = self.lines[line_idx:]
+                line_idx += len(new_lines)
+                is_done = self.is_done
+
+            yield from new_lines
+
+            if is_done and (line_idx >= len(self.lines)):
+                break
+
+    def cancel(self) -> bool:
+        """Cancel the job if it's queued or running. Returns False if done."""
+        with self._condition:
+            if self.is_done:
+                return False
+
+            self._is_cancel_requested = True
+            if self.status == TrainJobStatus.QUEUED:
+                # Never started
+                self._finish(TrainJobStatus.CANCELLED)
+                return True
+
+        self.log("Cancelling")
+        loop, task = self._loop, self._task
+        if (loop is not None) and (task is not None):
+            loop.call_soon_threadsafe(task.cancel)
+
+        return True
+
+    def run(self, run_job: Callable[["TrainJob"], Awaitable[bool]]) -> None:
+        """Run the job in a new event loop in the current thread."""
+        with self._condition:
+            if self._is_cancel_requested:
+                return
+
+            self.status = TrainJobStatus.RUNNING
+            self.start_time = time.time()
+
+        handler = _JobLogHandler(self, threading.get_ident())
+        loggers = [logging.getLogger(name) for name in JOB_LOGGER_NAMES]
+        for logger in loggers:
+            logger.addHandler(handler)
+
+        loop = asyncio.new_event_loop()
+        try:
+            self._task = loop.create_task(run_job(self))
+            self._loop = loop
+            if self._is_cancel_requested:
+                # Cancelled while the task was being created
+                self._task.cancel()
+
+            self.is_trained = loop.run_until_complete(self._task)
+            self._finish(TrainJobStatus.SUCCEEDED)
+        except asyncio.CancelledError:
+            self._finish(TrainJobStatus.CANCELLED)
+        except Exception as err:
+            _LOGGER.exception("Unexpected error in training job %s", self.id)
+            self._finish(TrainJobStatus.FAILED, str(err) or repr(err))
+        finally:
+            for logger in loggers:
+                logger.removeHandler(handler)
+
+            self._loop = None
+            self._task = None
+            loop.close()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "model_id": self.model_id,
+            "suffix": self.suffix,
+            "status": self.status.value,
+            "stage": self.stage,
+            "error": self.error,
+            "is_trained": self.is_trained,
+            "created_time": self.created_time,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+        }
+
+    def _finish(self, status: TrainJobStatus, error: Optional[str] = None) -> None:
+        with self._condition:
+            self.status = status
+            self.stage = status.value
+            self.error = error
+            self.end_time = time.time()
+            self._condition.notify_all()
+
+
+class _JobLogHandler(logging.Handler):
+    """Copies log messages from the job's thread into the job."""
+
+    def __init__(self, job: TrainJob, thread_id: int) -> None:
+        super().__init__(logging.DEBUG)
+        self.job = job
+        self.thread_id = thread_id
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.thread == self.thread_id:
+            self.job.log(record.getMessage())
+
+
+class TrainJobManager:
+    """Runs training jobs in background threads.
+
+    Each job runs in its own thread and event loop, so training doesn't block
+    web requests or the Wyoming server. At most max_running jobs train at the
+    same time, and other jobs wait in the queue. Only one job per model can be
+    queued or running.
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[TrainJob], Awaitable[bool]],
+        max_running: int = 1,
+        max_finished: int = 20,
+    ) -> None:
+        self.run_job = run_job
+        self.max_finished = max_finished
+
+        self._jobs: "OrderedDict[str, TrainJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._running = threading.Semaphore(max(1, max_running))
+
+    def submit(
+        self, model_id: str, suffix: Optional[str] = None, force: bool = False
+    ) -> Tuple[TrainJob, bool]:
+        """Queue a training job.
+
+        Returns the job and True if it's new, or the existing job for the same
+        model and False.
+        """
+        with self._lock:
+            active_job = self._find_active(model_id, suffix)
+            if active_job is not None:
+                return active_job, False
+
+            job = TrainJob(model_id, suffix, force)
+            self._jobs[job.id] = job
+            self._prune()
+
+        job.log("Training queued")
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+        return job, True
+
+    def get(self, job_id: str) -> Optional[TrainJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_active(
+        self, model_id: str, suffix: Optional[str] = None
+    ) -> Optional[TrainJob]:
+        """Get the queued or running job for a model."""
+        with self._lock:
+            return self._find_active(model_id, suffix)
+
+    @property
+    def jobs(self) -> List[TrainJob]:
+        """All jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. Returns False if it's unknown or done."""
+        job = self.get(job_id)
+        if job is None:
+            return False
+
+        return job.cancel()
+
+    def _find_active(self, model_id: str, suffix: Optional[str]) -> Optional[TrainJob]:
+        """Lock must be held."""
+        for job in self._jobs.values():
+            if (job.key == (model_id, suffix)) and (not job.is_done):
+                return job
+
+        return None
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs. Lock must be held."""
+        finished_ids = [job.id for job in self._jobs.values() if job.is_done]
+        for job_id in finished_ids[: max(0, len(finished_ids) - self.max_finished)]:
+            self._jobs.pop(job_id)
+
+    def _run(self, job: TrainJob) -> None:
+        if job.is_done:
+            # Cancelled while queued
+            return
+
+        with self._running:
+            job.run(self.run_job)
@@ -0,0 +1,143 @@
+"""Voice activity detection helpers."""
+
+from typing import Optional, Tuple
+
+
+class Endpointer:
+    """Detects the end of an utterance from VAD speech probabilities.
+
+    The utterance ends after silence_seconds of trailing silence once at least
+    min_speech_seconds of speech has been seen, or when it is longer than
+    max_seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        min_speech_seconds: float,
+        silence_seconds: float,
+        max_seconds: Optional[float] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.min_speech_seconds = min_speech_seconds
+        self.silence_seconds = silence_seconds
+        self.max_seconds = max_seconds
+
+        self.speech_seconds = 0.0
+        self.trailing_silence_seconds = 0.0
+        self.total_seconds = 0.0
+        self.is_ended = False
+
+    def reset(self) -> None:
+        self.speech_seconds = 0.0
+        self.trailing_silence_seconds = 0.0
+        self.total_seconds = 0.0
+        self.is_ended = False
+
+    def process(self, speech_prob: float, chunk_seconds: float) -> bool:
+        """Process the speech probability of a chunk. Returns True when ended."""
+        if self.is_ended:
+            return True
+
+        self.total_seconds += chunk_seconds
+        if speech_prob > self.threshold:
+            self.speech_seconds += chunk_seconds
+            self.trailing_silence_seconds = 0.0
+        else:
+            self.trailing_silence_seconds += chunk_seconds
+
+        if (self.max_seconds is not None) and (self.total_seconds >= self.max_seconds):
+            self.is_ended = True
+        elif (self.speech_seconds >= self.min_speech_seconds) and (
+            self.trailing_silence_seconds >= self.silence_seconds
+        ):
+            self.is_ended = True
+
+        return self.is_ended
+
+
+class PauseDetector:
+    """Detects pauses in speech from VAD speech probabilities.
+
+    A pause starts after pause_seconds of silence that follows speech, and ends
+    when speech is detected again.
+    """
+
+    def __init__(self, threshold: float, pause_seconds: float) -> None:
+        self.threshold = threshold
+        self.pause_seconds = pause_seconds
+
+        self.silence_seconds = 0.0
+        self.is_paused = False
+
+    def reset(self) -> None:
+        self.silence_seconds = 0.0
+        self.is_paused = False
+
+    def process(self, speech_prob: float, chunk_seconds: float) -> bool:
+        """Process the speech probability of a chunk.
+
+        Returns True only for the chunk where a pause starts.
+        """
+        if speech_prob > self.threshold:
+            self.silence_seconds = 0.0
+            self.is_paused = False
+            return False
+
+        self.silence_seconds += chunk_seconds
+        if self.is_paused or (self.silence_seconds < self.pause_seconds):
+            return False
+
+        self.is_paused = True
+        return True
+
+
+class SpeechTrimmer:
+    """Finds where speech starts and ends from VAD speech probabilities.
+
+    Times are in seconds from the first processed chunk. Audio outside of the
+    speech bounds (plus padding) can be trimmed before decoding.
+    """
+
+    def __init__(self, threshold: float, padding_seconds: float) -> None:
+        self.threshold = threshold
+        self.padding_seconds = padding_seconds
+
+        self.total_seconds = 0.0
+        self.speech_start_seconds: Optional[float] = None
+        self.speech_end_seconds: Optional[float] = None
+
+    def reset(self) -> None:
+        self.total_seconds = 0.0
+        self.speech_start_seconds = None
+        self.speech_end_seconds = None
+
+    def process(self, speech_prob: float, chunk_seconds: float) -> None:
+        """Process the speech probability of the next chunk."""
+        if speech_prob > self.threshold:
+            if self.speech_start_seconds is None:
+                self.speech_start_seconds = self.total_seconds
+
+            self.speech_end_seconds = self.total_seconds + chunk_seconds
+
+        self.total_seconds += chunk_seconds
+
+    def get_bounds(
+        self, offset_seconds: float, length_seconds: float
+    ) -> Tuple[float, float]:
+        """Get (start, end) seconds to keep of audio that begins at offset_seconds.
+
+        All of the audio is kept if no speech was detected.
+        """
+        if (self.speech_start_seconds is None) or (self.speech_end_seconds is None):
+            return (0.0, length_seconds)
+
+        start_seconds = (
+            self.speech_start_seconds - self.padding_seconds - offset_seconds
+        )
+        end_seconds = self.speech_end_seconds + self.padding_seconds - offset_seconds
+
+        return (
+            min(length_seconds, max(0.0, start_seconds)),
+            max(0.0, min(length_seconds, end_seconds)),
+        )
@@ -0,0 +1,179 @@
+"""Warm up trained models before the first request."""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+from rhasspy_speech.transcribe_stream import KaldiNnet3StreamTranscriber
+
+from .decoder import DecoderKey, create_transcriber, get_lang_dirs, get_model_paths
+from .shared import AppState, split_model_name
+
+_LOGGER = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+# 16Khz 16-bit mono
+SILENCE_SECONDS = 0.5
+SILENCE = bytes(int(16000 * 2 * SILENCE_SECONDS))
+
+
+def prefetch_files(paths: Iterable[Path]) -> int:
+    """Read files (or all files in directories) into the page cache.
+
+    Returns the number of bytes read.
+    """
+    num_bytes = 0
+    buffer = bytearray(READ_CHUNK_BYTES)
+    for file_path in iter_files(paths):
+        with open(file_path, "rb") as prefetch_file:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(prefetch_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+            while True:
+                num_read = prefetch_file.readinto(buffer)
+                if not num_read:
+                    break
+
+                num_bytes += num_read
+
+    return num_bytes
+
+
+def iter_files(paths: Iterable[Path]) -> Iterable[Path]:
+    """Yield files, and all files inside directories."""
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.is_file())
+        elif path.is_file():
+            yield path
+
+
+def get_warmup_models(
+    state: AppState, model_names: Optional[List[str]] = None
+) -> List[Tuple[str, Optional[str]]]:
+    """Get trained (model_id, suffix) pairs to warm up.
+
+    Model names are <model_id> or <model_id>/<suffix>. If not given, the models
+    for each language are used.
+    """
+    trained_models = set(state.model_catalog.trained_models)
+
+    models: List[Tuple[str, Optional[str]]] = []
+    if model_names:
+        for model_name in model_names:
+            model = split_model_name(model_name)
+            if model in trained_models:
+                models.append(model)
+            else:
+                _LOGGER.warning("Can't warm up untrained model: %s", model_name)
+    else:
+        for model_id in sorted(set(state.settings.model_id_for_language.values())):
+            if (model_id, None) in trained_models:
+                models.append((model_id, None))
+
+    return models
+
+
+async def warm_up(state: AppState, models: List[Tuple[str, Optional[str]]]) -> None:
+    """Prefetch model files and run a short decode of silence for each model."""
+    loop = asyncio.get_running_loop()
+    for model_id, suffix in models:
+        model_name = model_id if suffix is None else f"{model_id}/{suffix}"
+        start_time = time.monotonic()
+        try:
+            num_bytes = await loop.run_in_executor(
+                None, prefetch_files, get_model_paths(state.settings, model_id, suffix)
+            )
+            _LOGGER.debug(
+                "Prefetched %s byte(s) for %s in %s second(s)",
+                num_bytes,
+                model_name,
+                time.monotonic() - start_time,
+            )
+
+            if state.settings.model_config(model_id).get("type") == "coqui":
+                await _decode_silence_coqui(state, model_id, suffix)
+            else:
+                await _decode_silence(state, model_id, suffix)
+
+            _LOGGER.info(
+                "Warmed up %s in %s second(s)",
+                model_name,
+                time.monotonic() - start_time,
+            )
+        except Exception:
+            _LOGGER.exception("Unexpected error warming up %s", model_name)
+
+
+# -----------------------------------------------------------------------------
+
+
+async def _silence_stream() -> AsyncIterator[bytes]:
+    yield SILENCE
+
+
+async def _decode_silence(
+    state: AppState, model_id: str, suffix: Optional[str] = None
+) -> None:
+    settings = state.settings
+    lang_dirs = get_lang_dirs(settings, model_id, suffix)
+
+    transcriber = create_transcriber(
+        settings, DecoderKey(model_id, suffix, settings.decode_mode), state.kaldi_tools
+    )
+    with tempfile.NamedTemporaryFile("wb+", suffix=".wav") as temp_file:
+        audio: Union[str, AsyncIterator[bytes]]
+        if isinstance(transcriber, KaldiNnet3StreamTranscriber):
+            audio = _silence_stream()
+        else:
+            wav_writer: wave.Wave_write = wave.open(temp_file.name, "wb")
+            with wav_writer:
+                wav_writer.setframerate(16000)
+                wav_writer.setsampwidth(2)
+                wav_writer.setnchannels(1)
+                wav_writer.writeframes(SILENCE)
+
+            audio = temp_file.name
+
+        if len(lang_dirs) == 2:
+            await transcriber.async_transcribe_rescore(
+                audio,
+                old_lang_dir=lang_dirs[0],
+                new_lang_dir=lang_dirs[1],
+                nbest=1,
+                max_fuzzy_cost=settings.max_fuzzy_cost,
+                require_fuzzy=False,
+            )
+        else:
+            await transcriber.async_transcribe(
+                audio,
+                lang_dir=lang_dirs[0],
+                nbest=1,
+                max_fuzzy_cost=settings.max_fuzzy_cost,
+                require_fuzzy=False,
+            )
+
+
+async def _decode_silence_coqui(
+    state: AppState, model_id: str, suffix: Optional[str] = None
+) -> None:
+    transcriber = state.coqui_pool.acquire(model_id)
+    try:
+        await transcriber.start_stream()
+        await transcriber.process_chunk(SILENCE)
+        probs = await transcriber.finish_stream()
+        await transcriber.decode_probs(
+            probs, state.settings.model_train_dir(model_id, suffix)
+        )
+    except BaseException:
+        state.coqui_pool.discard(transcriber)
+        raise
+
+    # Keep worker for the first request
+    state.coqui_pool.release(transcriber)
@@ -4,34 +4,50 @@ import base64
 import io
 import json
 import logging
+import os
 import re
 import shutil
 import tarfile
 import tempfile
 import time
 from collections.abc import Collection, Iterable
-from logging.handlers import QueueHandler
+from functools import partial
 from pathlib import Path
-from queue import Queue
 from typing import Any, Dict, List, Optional, TextIO, Tuple, Union
 from urllib.request import urlopen
 
-from flask import Flask, Response, redirect, render_template, request
+from flask import Flask, Response, jsonify, redirect, render_template, request
 from flask import url_for as flask_url_for
 from rhasspy_speech.const import LangSuffix
 from rhasspy_speech.g2p import LexiconDatabase, get_sounds_like, guess_pronunciations
 from rhasspy_speech.tools import KaldiTools
 from rhasspy_speech.train import train_model as rhasspy_train_model
 from werkzeug.middleware.proxy_fix import ProxyFix
-from yaml import SafeDumper, safe_dump, safe_load
+from yaml import SafeDumper
+from yaml import load as yaml_load
+from yaml import safe_dump, safe_load
 
 from hassil.intents import Intents
 from hassil.util import merge_dict
 
 from .hass_api import get_exposed_dict
+from .intents_cache import get_cache_key, load_cached, save_cached
 from .models import MODELS
 from .sample import sample_intents
 from .shared import AppState
+from .train_cache import (
+    get_stale_suffixes,
+    get_suffix_hash,
+    hash_training_inputs,
+    remove_stamp,
+    write_stamp,
+)
+from .train_jobs import TrainJob, TrainJobManager, TrainJobStatus
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader  # type: ignore[assignment]
 
 _DIR = Path(__file__).parent
 _LOGGER = logging.getLogger(__name__)
@@ -56,6 +72,11 @@ def get_app(state: AppState) -> Flask:
         static_folder=str(_DIR / "static"),
     )
 
+    train_jobs = TrainJobManager(
+        partial(run_train_job, state),
+        max_running=state.settings.train_workers or os.cpu_count() or 1,
+    )
+
     if state.settings.hass_ingress:
         app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1)  # type: ignore[assignment]
         app.jinja_env.globals["url_for"] = ingress_url_for
@@ -92,6 +113,7 @@ def get_app(state: AppState) -> Flask:
             suffix=suffix,
             suffixes=state.settings.get_suffixes(model_id),
             has_sentences=sentences_path.exists(),
+            train_job=train_jobs.get_active(model_id, suffix),
         )
 
     @app.route("/download")
@@ -144,46 +166,66 @@ def get_app(state: AppState) -> Flask:
 
         return Response(download_model(), content_type="text/plain")
 
-    @app.route("/api/train", methods=["POST"])
-    async def api_train() -> Union[str, Response]:
+    @app.route("/api/train", methods=["GET", "POST"])
+    def api_train() -> Union[Response, Tuple[Response, int]]:
+        if request.method == "GET":
+            return jsonify([job.to_dict() for job in train_jobs.jobs])
+
         model_id = request.args["id"]
         suffix = request.args.get("suffix")
+        job, is_new = train_jobs.submit(
+            model_id, suffix, force=is_true(request.args.get("force"))
+        )
 
-        logger = logging.getLogger("rhasspy_speech")
-        logger.setLevel(logging.DEBUG)
-        log_queue: "Queue[Optional[logging.LogRecord]]" = Queue()
-        handler = QueueHandler(log_queue)
+        return (
+            jsonify(
+                {
+                    **job.to_dict(),
+                    "is_new": is_new,
+                    "status_url": ingress_url_for("api_train_job", job_id=job.id),
+                    "stream_url": ingress_url_for("api_train_stream", job_id=job.id),
+                    "cancel_url": ingress_url_for("api_train_cancel", job_id=job.id),
+                }
+            ),
+            202 if is_new else 200,
+        )
 
-        if state.settings.hass_auto_train and state.settings.hass_token:
-            try:
-                _LOGGER.debug("Downloading Home Assistant entities")
-                lists_path = state.settings.lists_path(model_id, suffix)
-                lists_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(lists_path, "w", encoding="utf-8") as lists_file:
-                    await write_exposed(state, lists_file)
-            except Exception as err:
-                return f"ERROR: Failed to download Home Assistant entities: {err}"
+    @app.route("/api/train/<job_id>")
+    def api_train_job(job_id: str) -> Response:
+        job = train_jobs.get(job_id)
+        if job is None:
+            return Response(f"Unknown job: {job_id}", status=404)
 
-        logger.addHandler(handler)
-        text = "Training started\n"
+        return jsonify(job.to_dict())
 
-        try:
-            start_time = time.monotonic()
-            await train_model(state, model_id, suffix, log_queue)
-            while True:
-                log_item = log_queue.get()
-                if log_item is None:
-                    break
-
-                text += log_item.getMessage() + "\n"
-            training_time = time.monotonic() - start_time
-            text += f"Training complete in {training_time:0.2f} second(s)\n"
-        except Exception as err:
-            text += f"ERROR: {err}"
-        finally:
-            logger.removeHandler(handler)
+    @app.route("/api/train/<job_id>/stream")
+    def api_train_stream(job_id: str) -> Response:
+        job = train_jobs.get(job_id)
+        if job is None:
+            return Response(f"Unknown job: {job_id}", status=404)
 
-        return Response(text, content_type="text/plain")
+        def stream_job() -> Iterable[str]:
+            for line in job.iter_lines():
+                yield line + "\n"
+
+            if job.status == TrainJobStatus.CANCELLED:
+                yield "Training cancelled\n"
+            elif job.status == TrainJobStatus.FAILED:
+                yield f"ERROR: {job.error}"
+            else:
+                if not job.is_trained:
+                    yield "Model is already trained from the same sentences\n"
+
+                assert job.start_time is not None
+                assert job.end_time is not None
+                training_time = job.end_time - job.start_time
+                yield f"Training complete in {training_time:0.2f} second(s)\n"
+
+        return Response(stream_job(), content_type="text/plain")
+
+    @app.route("/api/train/<job_id>/cancel", methods=["POST"])
+    def api_train_cancel(job_id: str) -> Response:
+        return jsonify({"cancelled": train_jobs.cancel(job_id)})
 
     @app.route("/sentences", methods=["GET", "POST"])
     def sentences():
@@ -239,6 +281,8 @@ def get_app(state: AppState) -> Flask:
         if model_train_dir.is_dir():
             shutil.rmtree(model_train_dir)
 
+        state.invalidate_model(model_id, suffix)
+
         return redirect(ingress_url_for("index"))
 
     @app.route("/api/hass_exposed", methods=["POST"])
@@ -337,6 +381,12 @@ def get_app(state: AppState) -> Flask:
             ),
         )
 
+    @app.route("/metrics")
+    def metrics() -> Response:
+        return Response(
+            state.metrics.render(), content_type="text/plain; version=0.0.4"
+        )
+
     @app.errorhandler(Exception)
     async def handle_error(err):
         """Return error as text."""
@@ -348,6 +398,11 @@ def get_app(state: AppState) -> Flask:
 # -----------------------------------------------------------------------------
 
 
+def is_true(value: Optional[str]) -> bool:
+    """Parse a boolean query parameter, e.g. ?force=1."""
+    return (value or "").strip().lower() in ("1", "true", "yes")
+
+
 def get_locale(model_id: str) -> str:
     return model_id.split("-", maxsplit=1)[0]
 
@@ -356,71 +411,115 @@ def get_language(model_id: str) -> str:
     return model_id.split("-", maxsplit=1)[0].split("_", maxsplit=1)[0]
 
 
-def get_intents(
+def get_intents_paths(
     state: AppState, model_id: str, suffix: Optional[str]
-) -> Tuple[Optional[Intents], Optional[Dict[str, Union[str, List[str]]]]]:
-    language = get_language(model_id)
-    words: Optional[Dict[str, Union[str, List[str]]]] = None
-
-    sentence_files: List[Union[str, Path]] = []
+) -> List[Path]:
+    """Get the builtin intents, sentences, and lists files used for training."""
+    paths: List[Path] = []
 
     if state.settings.hass_builtin_intents:
-        # Add builtin intents first so that custom sentences can override
-        intents_path = _DIR / "sentences" / f"{language}.yaml"
+        intents_path = _DIR / "sentences" / f"{get_language(model_id)}.yaml"
         if intents_path.exists():
-            sentence_files.append(intents_path)
+            paths.append(intents_path)
 
     sentences_path = state.settings.sentences_path(model_id, suffix)
     if sentences_path.exists():
-        temp_sentences = tempfile.NamedTemporaryFile("w+", suffix=".yaml")
-        with open(sentences_path, "r", encoding="utf-8") as sentences_file:
-            intents_dict: Dict[str, Any] = {"language": language}
-            sentences_dict = safe_load(sentences_file)
-            sentences = sentences_dict.pop("sentences", None)
-            words = sentences_dict.pop("words", None)
-            if sentences:
-                intent_data = []
-                plain_sentences = []
-                for sentence in sentences:
-                    if isinstance(sentence, str):
-                        plain_sentences.append(sentence)
-                    else:
-                        sentence_template = sentence.pop("in", None)
-                        if not sentence_template:
-                            _LOGGER.warning("Malformed sentence: %s", sentence)
-                            continue
+        paths.append(sentences_path)
 
-                        # Override sentence output
-                        sentence_output = sentence.pop("out", None)
-                        if sentence_output:
-                            sentence.setdefault("metadata", {})
-                            sentence["metadata"]["output"] = sentence_output
+    if paths and state.settings.hass_auto_train:
+        lists_path = state.settings.lists_path(model_id, suffix)
+        if lists_path.exists():
+            paths.append(lists_path)
 
-                        intent_data.append(
-                            {"sentences": [sentence_template], **sentence}
-                        )
+    return paths
 
-                if plain_sentences:
-                    intent_data.append({"sentences": plain_sentences})
 
-                intents_dict["intents"] = {USER_INTENT: {"data": intent_data}}
+def get_intents(
+    state: AppState, model_id: str, suffix: Optional[str]
+) -> Tuple[Optional[Intents], Optional[Dict[str, Union[str, List[str]]]]]:
+    """Get parsed intents and custom words for a model.
 
-            merge_dict(intents_dict, sentences_dict)
-            safe_dump(intents_dict, temp_sentences)
+    Parsing is slow for large sentence files, so the result is cached on disk
+    until one of the files from get_intents_paths changes.
+    """
+    intents_paths = get_intents_paths(state, model_id, suffix)
+    if not intents_paths:
+        return None, None
 
-        temp_sentences.seek(0)
-        sentence_files.append(temp_sentences.name)
+    cache_path = state.settings.intents_cache_path(model_id, suffix)
+    cache_key = get_cache_key(intents_paths, get_language(model_id))
+    cached = load_cached(cache_path, cache_key)
+    if cached is not None:
+        _LOGGER.debug("Loaded cached intents: %s", cache_path)
+        return cached
 
-    if not sentence_files:
-        return None, None
+    intents, words = _parse_intents(state, model_id, suffix, intents_paths)
+    save_cached(cache_path, cache_key, (intents, words))
 
-    if state.settings.hass_auto_train:
-        # Use Home Assistant entities, if they exist
-        lists_path = state.settings.lists_path(model_id, suffix)
-        if lists_path.exists():
-            sentence_files.append(lists_path)
+    return intents, words
+
+
+def _parse_intents(
+    state: AppState, model_id: str, suffix: Optional[str], intents_paths: List[Path]
+) -> Tuple[Intents, Optional[Dict[str, Union[str, List[str]]]]]:
+    """Merge builtin intents, custom sentences, and lists in memory."""
+    language = get_language(model_id)
+    words: Optional[Dict[str, Union[str, List[str]]]] = None
+
+    # Builtin intents come first so that custom sentences can override
+    sentences_path = state.settings.sentences_path(model_id, suffix)
+    intents_dict: Dict[str, Any] = {}
+    for intents_path in intents_paths:
+        with open(intents_path, "r", encoding="utf-8") as intents_file:
+            file_dict = load_yaml(intents_file) or {}
+
+        if intents_path == sentences_path:
+            words = file_dict.pop("words", None)
+            file_dict = _get_custom_intents_dict(file_dict, language)
+
+        merge_dict(intents_dict, file_dict)
+
+    return Intents.from_dict(intents_dict), words
+
+
+def _get_custom_intents_dict(
+    sentences_dict: Dict[str, Any], language: str
+) -> Dict[str, Any]:
+    """Convert custom sentences into the intents format."""
+    intents_dict: Dict[str, Any] = {"language": language}
+    sentences = sentences_dict.pop("sentences", None)
+    if sentences:
+        intent_data = []
+        plain_sentences = []
+        for sentence in sentences:
+            if isinstance(sentence, str):
+                plain_sentences.append(sentence)
+            else:
+                sentence_template = sentence.pop("in", None)
+                if not sentence_template:
+                    _LOGGER.warning("Malformed sentence: %s", sentence)
+                    continue
 
-    return Intents.from_files(sentence_files), words
+                # Override sentence output
+                sentence_output = sentence.pop("out", None)
+                if sentence_output:
+                    sentence.setdefault("metadata", {})
+                    sentence["metadata"]["output"] = sentence_output
+
+                intent_data.append({"sentences": [sentence_template], **sentence})
+
+        if plain_sentences:
+            intent_data.append({"sentences": plain_sentences})
+
+        intents_dict["intents"] = {USER_INTENT: {"data": intent_data}}
+
+    merge_dict(intents_dict, sentences_dict)
+    return intents_dict
+
+
+def load_yaml(yaml_file: TextIO) -> Any:
+    """Load YAML with the C loader from libyaml, if available."""
+    return yaml_load(yaml_file, Loader=SafeLoader)
 
 
 async def write_exposed(state: AppState, yaml_file: TextIO) -> None:
@@ -448,22 +547,40 @@ def load_responses(
         )
 
 
+async def run_train_job(state: AppState, job: TrainJob) -> bool:
+    """Download Home Assistant entities (if enabled) and train a job's model."""
+    logging.getLogger("rhasspy_speech").setLevel(logging.DEBUG)
+
+    if state.settings.hass_auto_train and state.settings.hass_token:
+        job.set_stage("entities")
+        try:
+            _LOGGER.debug("Downloading Home Assistant entities")
+            lists_path = state.settings.lists_path(job.model_id, job.suffix)
+            lists_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(lists_path, "w", encoding="utf-8") as lists_file:
+                await write_exposed(state, lists_file)
+        except Exception as err:
+            raise RuntimeError(
+                f"Failed to download Home Assistant entities: {err}"
+            ) from err
+
+    job.set_stage("training")
+    return await train_model(state, job.model_id, job.suffix, force=job.force)
+
+
 async def train_model(
     state: AppState,
     model_id: str,
     suffix: Optional[str] = None,
-    log_queue: Optional[Queue] = None,
-):
-    try:
-        _LOGGER.info("Training %s (suffix=%s)", model_id, suffix)
-        start_time = time.monotonic()
-        language = get_language(model_id)
-        intents, words = get_intents(state, model_id, suffix)
-        if intents is None:
-            raise ValueError("No intents")
+    force: bool = False,
+) -> bool:
+    """Train a model unless it was already trained from the same inputs.
 
+    Returns True if the model was trained.
+    """
+    try:
         model_train_dir = state.settings.model_train_dir(model_id, suffix)
-        model_train_dir.mkdir(parents=True, exist_ok=True)
+        model_dir = state.settings.models_dir / model_id
 
         lang_suffixes: Collection[LangSuffix]
         if state.settings.decode_mode == "grammar":
@@ -473,22 +590,70 @@ async def train_model(
         else:
             lang_suffixes = (LangSuffix.ARPA,)
 
+        inputs_hash = hash_training_inputs(
+            get_intents_paths(state, model_id, suffix), model_dir
+        )
+        suffix_hashes = {
+            lang_suffix.value: get_suffix_hash(
+                inputs_hash,
+                lang_suffix.value,
+                rescore_order=(
+                    state.settings.arpa_rescore_order
+                    if lang_suffix == LangSuffix.ARPA_RESCORE
+                    else None
+                ),
+            )
+            for lang_suffix in lang_suffixes
+        }
+
+        if force:
+            stale_suffixes = list(suffix_hashes.keys())
+        else:
+            stale_suffixes = get_stale_suffixes(model_train_dir, suffix_hashes)
+
+        if not stale_suffixes:
+            _LOGGER.info(
+                "Model is up to date, skipping training: %s (suffix=%s)",
+                model_id,
+                suffix,
+            )
+            return False
+
+        _LOGGER.info(
+            "Training %s (suffix=%s, lang=%s)", model_id, suffix, stale_suffixes
+        )
+        start_time = time.monotonic()
+        language = get_language(model_id)
+        intents, words = get_intents(state, model_id, suffix)
+        if intents is None:
+            raise ValueError("No intents")
+
+        model_train_dir.mkdir(parents=True, exist_ok=True)
+        for lang_suffix_value in stale_suffixes:
+            remove_stamp(model_train_dir, lang_suffix_value)
+
         await rhasspy_train_model(
             language=language,
             intents=intents,
-            model_dir=state.settings.models_dir / model_id,
+            model_dir=model_dir,
             train_dir=model_train_dir,
             words=words,
             tools=KaldiTools.from_tools_dir(state.settings.tools_dir),
-            lang_suffixes=lang_suffixes,
+            lang_suffixes=[LangSuffix(value) for value in stale_suffixes],
             rescore_order=state.settings.arpa_rescore_order,
         )
+
+        for lang_suffix_value in stale_suffixes:
+            write_stamp(
+                model_train_dir, lang_suffix_value, suffix_hashes[lang_suffix_value]
+            )
+
+        state.invalidate_model(model_id, suffix)
         _LOGGER.debug(
             "Training completed in %s second(s)", time.monotonic() - start_time
         )
+
+        return True
     except Exception as err:
         _LOGGER.exception("Unexpected error while training")
         raise err
-    finally:
-        if log_queue is not None:
-            log_queue.put(None)